@@ -1,4 +1,7 @@
-from fastapi import FastAPI, HTTPException
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,12 +10,22 @@ import os
 
 # Import classifier
 from backend.contract_classifier import (
+    CACHE,
+    STORE_PATH,
     classify_raw_contract_text,
     classify_rag_contract_text,
+    stream_raw_contract_text,
+    stream_rag_contract_text,
 )
+from backend.openai_client import client
+from backend.retrieve_embeddings import EmbeddingBatcher, KnowledgeStore
 
 # Import generator
-from backend.contract_generator import generate_malicious_contract
+from backend.contract_generator import (
+    ATTACK_TYPES,
+    generate_malicious_contract,
+    stream_malicious_contract,
+)
 
 ROOT = os.path.dirname(os.path.abspath(__file__))
 PARENT = os.path.dirname(ROOT)
@@ -29,10 +42,25 @@ MODEL_MAPPING = {
     "gpt-5.1": "gpt-5.1",
 }
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the RAG store once per process; the embedding matrix is
+    # memory-mapped, so workers share the same OS page cache.
+    ks = KnowledgeStore(path=STORE_PATH)
+    ks.load()
+    ks.batcher = EmbeddingBatcher()
+    await ks.batcher.start()
+    app.state.ks = ks
+    yield
+    await ks.batcher.stop()
+    await client.close()
+
+
 app = FastAPI(
     title="SolidGuard Backend API",
     description="Smart contract vulnerability classifier + generator with selectable models",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -62,9 +90,14 @@ def home():
     return {"message": "SolidGuard backend is running!"}
 
 
+@app.get("/cache/stats")
+def cache_stats():
+    return CACHE.stats()
+
+
 # ---------- CLASSIFICATION ----------
 @app.post("/classify")
-def classify(req: ClassificationRequest):
+async def classify(req: ClassificationRequest, request: Request):
 
     if req.model not in ALLOWED_MODELS:
         raise HTTPException(status_code=400, detail=f"Invalid model. Allowed: {ALLOWED_MODELS}")
@@ -77,10 +110,14 @@ def classify(req: ClassificationRequest):
         actual_model = MODEL_MAPPING.get(req.model, req.model)
 
         if req.mode == "raw":
-            result = classify_raw_contract_text(contract_text=req.contract_text, model=actual_model)
+            result = await classify_raw_contract_text(contract_text=req.contract_text, model=actual_model)
 
         elif req.mode == "rag":
-            result = classify_rag_contract_text(contract_text=req.contract_text, model=actual_model)
+            result = await classify_rag_contract_text(
+                contract_text=req.contract_text,
+                ks=request.app.state.ks,
+                model=actual_model,
+            )
 
         else:
             raise HTTPException(status_code=400, detail="Mode must be 'raw' or 'rag'")
@@ -91,9 +128,52 @@ def classify(req: ClassificationRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/classify/stream")
+async def classify_stream(req: ClassificationRequest, request: Request):
+    """
+    Same as /classify, but streamed as Server-Sent Events:
+        event: token   {"text": ...}   raw model output as it arrives
+        event: result  same body as /classify (refs filled in)
+        event: error   {"detail": ...}
+    """
+
+    if req.model not in ALLOWED_MODELS:
+        raise HTTPException(status_code=400, detail=f"Invalid model. Allowed: {ALLOWED_MODELS}")
+
+    if not req.contract_text.strip():
+        raise HTTPException(status_code=400, detail="Contract text is empty.")
+
+    actual_model = MODEL_MAPPING.get(req.model, req.model)
+
+    if req.mode == "raw":
+        stream = stream_raw_contract_text(contract_text=req.contract_text, model=actual_model)
+    elif req.mode == "rag":
+        stream = stream_rag_contract_text(
+            contract_text=req.contract_text,
+            ks=request.app.state.ks,
+            model=actual_model,
+        )
+    else:
+        raise HTTPException(status_code=400, detail="Mode must be 'raw' or 'rag'")
+
+    async def events():
+        try:
+            async for event, payload in stream:
+                if event == "token":
+                    data = {"text": payload}
+                else:
+                    data = {"success": True, "mode": req.mode, "model": req.model, "result": payload}
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 # ---------- GENERATION ----------
 @app.post("/generate")
-def generate(req: GenerationRequest):
+async def generate(req: GenerationRequest):
 
     if req.model not in ALLOWED_MODELS:
         raise HTTPException(status_code=400, detail=f"Invalid model. Allowed: {ALLOWED_MODELS}")
@@ -102,7 +182,7 @@ def generate(req: GenerationRequest):
         # Use the mapped model name for API calls
         actual_model = MODEL_MAPPING.get(req.model, req.model)
 
-        metadata, malicious = generate_malicious_contract(
+        metadata, malicious = await generate_malicious_contract(
             req.attack_type,
             actual_model
         )
@@ -119,6 +199,47 @@ def generate(req: GenerationRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/generate/stream")
+async def generate_stream(req: GenerationRequest):
+    """
+    Same as /generate, but streamed as Server-Sent Events:
+        event: token     {"text": ...}       raw model output as it arrives
+        event: metadata  {"metadata": ...}   JSON block, once complete
+        event: result    same body as /generate
+        event: error     {"detail": ...}
+    """
+
+    if req.model not in ALLOWED_MODELS:
+        raise HTTPException(status_code=400, detail=f"Invalid model. Allowed: {ALLOWED_MODELS}")
+
+    if req.attack_type not in ATTACK_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid attack type: {req.attack_type}")
+
+    actual_model = MODEL_MAPPING.get(req.model, req.model)
+
+    async def events():
+        try:
+            async for event, payload in stream_malicious_contract(req.attack_type, actual_model):
+                if event == "token":
+                    data = {"text": payload}
+                elif event == "metadata":
+                    data = {"metadata": payload}
+                else:
+                    metadata, malicious = payload
+                    data = {
+                        "success": True,
+                        "attack_type": req.attack_type,
+                        "model": req.model,
+                        "metadata": metadata,
+                        "malicious": malicious,
+                    }
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 
 # ---------- Local Debug ----------
 if __name__ == "__main__":
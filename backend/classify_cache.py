@@ -0,0 +1,129 @@
+"""
+classify_cache.py
+
+In-process cache for /classify results.
+
+Two tiers:
+    1. Exact    — LRU keyed on sha256(contract_text, mode, model, k)
+    2. Semantic — ring buffer of recent RAG query embeddings; a new query
+                  whose cosine similarity to a cached one exceeds the
+                  threshold reuses that result (same scope only: model,
+                  k and line count). Off unless semantic=True, because a
+                  near-identical contract can still differ in the one
+                  line that matters, and the reused result's line
+                  numbers belong to the other contract.
+
+Results are deep-copied on the way in and out so callers can mutate them.
+"""
+
+import copy
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class ClassificationCache:
+    """
+    Exact + semantic cache for classification results.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        semantic_size: int = 128,
+        threshold: float = 0.98,
+        semantic: bool = False,
+    ):
+        self.maxsize = maxsize
+        self.semantic = semantic
+        self.semantic_size = semantic_size
+        self.threshold = threshold
+
+        self._exact: "OrderedDict[str, Dict]" = OrderedDict()
+
+        self._vecs: Optional[np.ndarray] = None   # (semantic_size, D), unit rows
+        self._scopes: List[Tuple] = []
+        self._results: List[Dict] = []
+        self._next = 0
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    # ------------------------ EXACT TIER ------------------------------
+
+    @staticmethod
+    def key(contract_text: str, mode: str, model: str, k: Optional[int] = None) -> str:
+        h = hashlib.sha256()
+        for part in (mode, model, str(k), contract_text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        result = self._exact.get(key)
+        if result is None:
+            return None
+        self._exact.move_to_end(key)
+        self.exact_hits += 1
+        return copy.deepcopy(result)
+
+    def put(self, key: str, result: Dict):
+        self._exact[key] = copy.deepcopy(result)
+        self._exact.move_to_end(key)
+        if len(self._exact) > self.maxsize:
+            self._exact.popitem(last=False)
+
+    # ------------------------ SEMANTIC TIER ---------------------------
+
+    def get_similar(self, q: np.ndarray, scope: Tuple) -> Optional[Dict]:
+        """
+        Return a cached result whose query embedding is within the
+        similarity threshold of `q` and was produced under the same scope.
+        """
+        if not (self.semantic and self._results):
+            return None
+
+        q = q / (np.linalg.norm(q) + 1e-12)
+        sims = self._vecs[:len(self._results)] @ q
+
+        for idx in np.argsort(-sims):
+            if sims[idx] < self.threshold:
+                break
+            if self._scopes[idx] == scope:
+                self.semantic_hits += 1
+                return copy.deepcopy(self._results[idx])
+
+        return None
+
+    def put_similar(self, q: np.ndarray, scope: Tuple, result: Dict):
+        if not self.semantic:
+            return
+        if self._vecs is None:
+            self._vecs = np.zeros((self.semantic_size, q.shape[0]), dtype=np.float32)
+
+        slot = self._next
+        self._vecs[slot] = q / (np.linalg.norm(q) + 1e-12)
+        if slot < len(self._results):
+            self._scopes[slot] = scope
+            self._results[slot] = copy.deepcopy(result)
+        else:
+            self._scopes.append(scope)
+            self._results.append(copy.deepcopy(result))
+        self._next = (slot + 1) % self.semantic_size
+
+    # ------------------------ STATS -----------------------------------
+
+    def record_miss(self):
+        self.misses += 1
+
+    def stats(self) -> Dict:
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "exact_entries": len(self._exact),
+            "semantic_entries": len(self._results),
+        }
@@ -4,9 +4,12 @@ contract_classifier.py
 Provides two simple functions for frontend use:
 
 1. classify_raw_contract_text(contract_text: str, model="gpt-5.1")
-2. classify_rag_contract_text(contract_text: str, model="gpt-5.1", k=5)
+2. classify_rag_contract_text(contract_text: str, ks: KnowledgeStore, model="gpt-5.1", k=5)
 
-Both return a Python dict containing the parsed JSON classification.
+Both are coroutines that return a Python dict containing the parsed JSON
+classification. stream_raw_contract_text / stream_rag_contract_text take
+the same arguments and yield the model's tokens as they arrive, then the
+same dict.
 
 This module:
     ✓ Does NOT write files
@@ -15,26 +18,23 @@ This module:
     ✓ Uses your existing RAW + RAG prompt logic
 """
 
-import os
+import asyncio
+import functools
 import json
+import os
 from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
+from string import Template
+from backend.classify_cache import ClassificationCache
+from backend.openai_client import client
 from backend.retrieve_embeddings import KnowledgeStore
 
-# Load environment
+# Backend directory
 LOCAL_ROOT = Path(__file__).resolve().parents[0]
-load_dotenv(LOCAL_ROOT / ".env")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY is missing in environment!")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
 
 # ---------------------------------------------
 # Constants
 # ---------------------------------------------
-ALLOWED_ATTACK_TYPES = [
+ALLOWED_ATTACK_TYPES = frozenset({
     "access_control",
     "arithmetic",
     "denial_of_service",
@@ -45,48 +45,120 @@ ALLOWED_ATTACK_TYPES = [
     "unchecked_return_value",
     "unencrypted_private_data",
     "unprotected_self_destruct",
-]
+})
+
+CONTRACT_ID = "user_input_contract"
+SYSTEM_PROMPT = "You are a strict smart-contract vulnerability classifier. Output ONLY JSON."
+
+
+def compile_template(text: str) -> Template:
+    """
+    Compile a prompt's {placeholders} into a string.Template, so each
+    request fills every field in one pass.
+    """
+    text = text.replace("$", "$$")
+    for field in ("retrieved_docs", "contract_id", "contract"):
+        text = text.replace("{" + field + "}", "${" + field + "}")
+    return Template(text)
+
+
+def load_prompt_template(name: str) -> Template:
+    """Read prompts/<name> as a compiled Template."""
+    return compile_template((LOCAL_ROOT / "prompts" / name).read_text(encoding="utf-8"))
 
-RAW_PROMPT = (LOCAL_ROOT / "prompts" / "classify_raw.txt").read_text(encoding="utf-8")
-RAG_PROMPT = (LOCAL_ROOT / "prompts" / "classify_rag.txt").read_text(encoding="utf-8")
 
-# For RAG retrieval
-KS = KnowledgeStore(path=LOCAL_ROOT / "knowledge_store.jsonl")
-KS.load()
+def load_rag_prompt() -> tuple:
+    """
+    Split classify_rag.txt at </INSTRUCTIONS> into:
+        • a static system message (identical for every request, so the
+          OpenAI prompt-prefix cache can reuse it), and
+        • a Template for the per-request RAG docs + contract.
+    """
+    text = (LOCAL_ROOT / "prompts" / "classify_rag.txt").read_text(encoding="utf-8")
+    instructions, _, variable = text.partition("</INSTRUCTIONS>")
+    instructions = instructions.replace("<INSTRUCTIONS>", "").strip()
+    system = SYSTEM_PROMPT + "\n\n" + compile_template(instructions).safe_substitute(
+        contract_id=CONTRACT_ID,
+    )
+    return system, compile_template(variable.strip())
+
+
+RAW_TEMPLATE = load_prompt_template("classify_raw.txt")
+RAG_SYSTEM_PROMPT, RAG_TEMPLATE = load_rag_prompt()
+
+# For RAG retrieval (loaded once by the app lifespan, see backend/app.py)
+STORE_PATH = LOCAL_ROOT / "knowledge_store.jsonl"
+
+# Exact + semantic result cache shared by both classifiers. The semantic
+# tier reuses another contract's result, so it is opt-in (SEMANTIC_CACHE=1)
+CACHE = ClassificationCache(semantic=os.getenv("SEMANTIC_CACHE") == "1")
 
 
 # ---------------------------------------------
 # Utilities
 # ---------------------------------------------
 
+@functools.lru_cache(maxsize=256)
 def number_contract_lines(text: str) -> str:
-    """Add line numbers to contract source."""
+    """Add line numbers to contract source (memoized per contract text)."""
     return "\n".join(f"{i+1}: {line}" for i, line in enumerate(text.splitlines()))
 
 
-def enforce_json_completion(model: str, prompt: str) -> dict:
-    """Send prompt → enforce JSON → return parsed dict."""
-    resp = client.chat.completions.create(
+@functools.lru_cache(maxsize=256)
+def build_raw_prompt(contract_text: str) -> str:
+    """Fully assembled RAW prompt for a contract (memoized)."""
+    return RAW_TEMPLATE.safe_substitute(
+        contract=number_contract_lines(contract_text),
+        contract_id=CONTRACT_ID,
+    )
+
+
+async def stream_json_completion(model: str, prompt: str, system: str = SYSTEM_PROMPT):
+    """
+    Send prompt → enforce JSON, streamed. Yields ("token", str) for each
+    text delta, then ("json", dict) with the parsed reply.
+    """
+    stream = await client.chat.completions.create(
         model=model,
         messages=[
-            {"role": "system",
-             "content": "You are a strict smart-contract vulnerability classifier. Output ONLY JSON."},
+            {"role": "system", "content": system},
             {"role": "user", "content": prompt},
         ],
         response_format={"type": "json_object"},
         temperature=0.0,
+        stream=True,
     )
-    raw = resp.choices[0].message.content
-    if raw is None:
+
+    parts = []
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+            yield "token", delta
+    finally:
+        await stream.close()
+
+    if not parts:
         raise RuntimeError("LLM returned no content (None). Cannot parse JSON.")
-    return json.loads(raw)
+    yield "json", json.loads("".join(parts))
+
+
+async def final_result(events) -> dict:
+    """Drain a stream_*_contract_text generator and return its result."""
+    async for event, payload in events:
+        if event == "result":
+            return payload
 
 
 # ---------------------------------------------
 # RAW CLASSIFIER FUNCTION
 # ---------------------------------------------
 
-def classify_raw_contract_text(contract_text: str, model: str = "gpt-5.1") -> dict:
+async def classify_raw_contract_text(contract_text: str, model: str = "gpt-5.1") -> dict:
     """
     Classify a smart contract WITHOUT RAG.
 
@@ -97,31 +169,45 @@ def classify_raw_contract_text(contract_text: str, model: str = "gpt-5.1") -> di
     Returns:
         dict: JSON classification
     """
-    numbered = number_contract_lines(contract_text)
+    return await final_result(stream_raw_contract_text(contract_text, model))
 
-    # Fill template
-    prompt = (
-        RAW_PROMPT
-        .replace("{contract}", numbered)
-        .replace("{contract_id}", "user_input_contract")
-    )
 
-    result = enforce_json_completion(model, prompt)
+async def stream_raw_contract_text(contract_text: str, model: str = "gpt-5.1"):
+    """
+    Same as classify_raw_contract_text, but yields ("token", str) for each
+    model delta and then ("result", dict). A cache hit yields only the result.
+    """
+    cache_key = CACHE.key(contract_text, "raw", model)
+    cached = CACHE.get(cache_key)
+    if cached is not None:
+        yield "result", cached
+        return
+    CACHE.record_miss()
+
+    prompt = await asyncio.to_thread(build_raw_prompt, contract_text)
+
+    async for event, payload in stream_json_completion(model, prompt):
+        if event == "token":
+            yield event, payload
+        else:
+            result = payload
 
     # RAW classifier requires refs=None
     if result.get("attacks"):
         for attack in result["attacks"]:
             attack["refs"] = None
 
-    return result
+    CACHE.put(cache_key, result)
+    yield "result", result
 
 
 # ---------------------------------------------
 # RAG CLASSIFIER FUNCTION
 # ---------------------------------------------
 
-def classify_rag_contract_text(
+async def classify_rag_contract_text(
     contract_text: str,
+    ks: KnowledgeStore,
     model: str = "gpt-5.1",
     k: int = 5,
 ) -> dict:
@@ -130,16 +216,53 @@ def classify_rag_contract_text(
 
     Args:
         contract_text (str): Solidity source code
+        ks (KnowledgeStore): Loaded knowledge store to retrieve from
         model (str): OpenAI model name
         k (int): Number of RAG documents to retrieve
 
     Returns:
         dict: JSON classification
     """
-    numbered = number_contract_lines(contract_text)
+    return await final_result(stream_rag_contract_text(contract_text, ks, model, k))
+
+
+async def stream_rag_contract_text(
+    contract_text: str,
+    ks: KnowledgeStore,
+    model: str = "gpt-5.1",
+    k: int = 5,
+):
+    """
+    Same as classify_rag_contract_text, but yields ("token", str) for each
+    model delta and then ("result", dict). The tokens are the model's raw
+    reply; refs are only filled in on the result. A cache hit yields only
+    the result.
+    """
+    cache_key = CACHE.key(contract_text, "rag", model, k)
+    cached = CACHE.get(cache_key)
+    if cached is not None:
+        yield "result", cached
+        return
+
+    # Overlap the query embedding (network) with line numbering (local),
+    # then run the similarity search off the event loop.
+    numbered, q = await asyncio.gather(
+        asyncio.to_thread(number_contract_lines, contract_text),
+        ks.embed_query(contract_text),
+    )
+
+    # Near-duplicate of a recent query → reuse its result, skip the LLM.
+    # Only contracts with the same line count qualify, so the reused
+    # line numbers at least point into a contract of the same shape.
+    scope = (model, k, numbered.count("\n") + 1)
+    cached = CACHE.get_similar(q, scope)
+    if cached is not None:
+        yield "result", cached
+        return
+    CACHE.record_miss()
 
     # Retrieve docs
-    hits = KS.retrieve(numbered, k=k)
+    hits = await asyncio.to_thread(ks.search, q, k)
     docs_block = []
     rag_refs = []
 
@@ -153,19 +276,24 @@ def classify_rag_contract_text(
 
     joined_docs = "\n\n".join(docs_block) if docs_block else "No RAG documents retrieved."
 
-    # Fill template
-    prompt = (
-        RAG_PROMPT
-        .replace("{retrieved_docs}", joined_docs)
-        .replace("{contract}", numbered)
-        .replace("{contract_id}", "user_input_contract")
+    # Fill template (single pass; substituted values are not rescanned).
+    # Static instructions go in the system message, variable blocks last.
+    prompt = RAG_TEMPLATE.safe_substitute(
+        retrieved_docs=joined_docs,
+        contract=numbered,
     )
 
-    result = enforce_json_completion(model, prompt)
+    async for event, payload in stream_json_completion(model, prompt, system=RAG_SYSTEM_PROMPT):
+        if event == "token":
+            yield event, payload
+        else:
+            result = payload
 
     # Append RAG refs to each attack
     if result.get("attacks"):
         for attack in result["attacks"]:
             attack["refs"] = rag_refs.copy()
 
-    return result
+    CACHE.put(cache_key, result)
+    CACHE.put_similar(q, scope, result)
+    yield "result", result
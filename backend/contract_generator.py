@@ -1,15 +1,10 @@
+import json
 from pathlib import Path
-from openai import OpenAI
-from dotenv import load_dotenv
+from backend.openai_client import client
 
 # ROOT = backend directory
 LOCAL_ROOT = Path(__file__).resolve().parents[0]
 
-# Load .env
-load_dotenv(LOCAL_ROOT / ".env")
-
-client = OpenAI()
-
 PROMPT_PATH = LOCAL_ROOT / "prompts" / "generate_contracts.txt"
 print(PROMPT_PATH)
 if not PROMPT_PATH.exists():
@@ -18,7 +13,7 @@ if not PROMPT_PATH.exists():
 PROMPT = PROMPT_PATH.read_text()
 
 
-ATTACK_TYPES = [
+ATTACK_TYPES = frozenset({
     "access_control",
     "arithmetic",
     "denial_of_service",
@@ -29,28 +24,13 @@ ATTACK_TYPES = [
     "unchecked_return_value",
     "unencrypted_private_data",
     "unprotected_self_destruct",
-]
-
-
-def extract_output_text(resp):
-    """Handles OpenAI ChatCompletions API response."""
-    try:
-        # Standard ChatCompletions API response
-        if hasattr(resp, 'choices') and resp.choices:
-            return resp.choices[0].message.content
+})
 
-        # Legacy format (if any)
-        if hasattr(resp, "output_text") and resp.output_text:
-            return resp.output_text
 
-        # Fallback for other formats
-        if hasattr(resp, 'outputs'):
-            return resp.outputs[0].content[0].text
+JSON_DECODER = json.JSONDecoder()
 
-    except Exception as e:
-        raise RuntimeError(f"Unable to extract LLM output: {e}")
-
-    raise RuntimeError("Unable to extract LLM output: Unknown response format")
+MALICIOUS_MARKER = "// MALICIOUS CONTRACT"
+STOP_MARKER = "// SAFE CONTRACT"   # extra section the prompt does not ask for
 
 
 def parse_llm_output(raw_output: str):
@@ -63,34 +43,36 @@ def parse_llm_output(raw_output: str):
     if start == -1:
         raise RuntimeError("No JSON found.")
 
-    brace_count = 0
-    end = None
-
-    for i, ch in enumerate(raw_output[start:], start):
-        if ch == "{":
-            brace_count += 1
-        elif ch == "}":
-            brace_count -= 1
-            if brace_count == 0:
-                end = i + 1
-                break
-
-    if end is None:
-        raise RuntimeError("JSON block not closed.")
+    # raw_decode parses in C and reports where the JSON object ends
+    try:
+        _, end = JSON_DECODER.raw_decode(raw_output, start)
+    except json.JSONDecodeError as e:
+        raise RuntimeError(f"Invalid JSON block: {e}")
 
     json_block = raw_output[start:end].strip()
 
     # -------- Extract malicious contract --------
     remainder = raw_output[end:]
-    if "// MALICIOUS CONTRACT" not in remainder:
+    if MALICIOUS_MARKER not in remainder:
         raise RuntimeError("Missing malicious contract marker.")
 
-    malicious = remainder.split("// MALICIOUS CONTRACT", 1)[1].strip()
+    malicious = remainder.split(MALICIOUS_MARKER, 1)[1].strip()
 
     return json_block, malicious
 
 
-def generate_malicious_contract(attack_type: str, model: str):
+async def stream_malicious_contract(attack_type: str, model: str):
+    """
+    Stream a generation and yield (event, payload) tuples as it arrives:
+
+        ("token", str)                   each text delta from the model
+        ("metadata", str)                the JSON block, as soon as it and the
+                                         malicious-contract marker are complete
+        ("result", (metadata, malicious)) once, at the end
+
+    Generation stops early if the model starts an extra section
+    (e.g. "// SAFE CONTRACT") after the malicious contract.
+    """
     if attack_type not in ATTACK_TYPES:
         raise ValueError(f"Invalid attack type: {attack_type}")
 
@@ -99,21 +81,72 @@ def generate_malicious_contract(attack_type: str, model: str):
         contract_id="web_generated"
     )
 
-    if model == "gpt-5.1":
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7
-        )
-    else:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=2000,
-            temperature=0.7
-        )
-
-    raw_output = extract_output_text(resp)
-    metadata, malicious = parse_llm_output(raw_output)
-
-    return metadata, malicious
+    kwargs = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.7,
+        "stream": True,
+    }
+    if model != "gpt-5.1":
+        kwargs["max_tokens"] = 2000
+
+    stream = await client.chat.completions.create(**kwargs)
+
+    parts = []           # deltas, joined once instead of += per token
+    size = 0             # total length of parts
+    window = ""          # text not yet searched, plus a short overlap
+    overlap = max(len(MALICIOUS_MARKER), len(STOP_MARKER)) - 1
+    marker_end = -1      # end offset of the first malicious marker
+    metadata_sent = False
+    stop = -1
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+
+            parts.append(delta)
+            size += len(delta)
+            yield "token", delta
+
+            # Search only the new text, plus enough of the old to catch a
+            # marker split across deltas, so streaming stays linear
+            window = window[-overlap:] + delta
+            base = size - len(window)
+
+            found = window.find(MALICIOUS_MARKER)
+            if found != -1 and marker_end == -1:
+                marker_end = base + found + len(MALICIOUS_MARKER)
+            if marker_end == -1:
+                continue
+
+            # The JSON block precedes the marker, so the buffer is parsed
+            # once per new marker rather than on every token
+            if not metadata_sent and found != -1:
+                try:
+                    metadata, _ = parse_llm_output("".join(parts))
+                except RuntimeError:
+                    pass
+                else:
+                    metadata_sent = True
+                    yield "metadata", metadata
+
+            found = window.find(STOP_MARKER, max(marker_end - base, 0))
+            if found != -1:
+                stop = base + found
+                break
+    finally:
+        await stream.close()
+
+    raw_output = "".join(parts)
+    if stop != -1:
+        raw_output = raw_output[:stop]
+    yield "result", parse_llm_output(raw_output)
+
+
+async def generate_malicious_contract(attack_type: str, model: str):
+    async for event, payload in stream_malicious_contract(attack_type, model):
+        if event == "result":
+            return payload
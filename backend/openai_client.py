@@ -0,0 +1,35 @@
+"""
+openai_client.py
+
+Single AsyncOpenAI client shared by every backend module.
+
+One pooled httpx client means TLS handshakes and keep-alive connections
+are reused across classification, generation, and embedding calls.
+HTTP/2 is enabled when the optional `h2` package is installed.
+"""
+
+import importlib.util
+import os
+from pathlib import Path
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+LOCAL_ROOT = Path(__file__).resolve().parents[0]   # backend/
+
+load_dotenv(LOCAL_ROOT / ".env")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+if not OPENAI_API_KEY:
+    raise RuntimeError("OPENAI_API_KEY is missing in environment!")
+
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# DefaultAsyncHttpxClient keeps the SDK's own timeout/redirect defaults.
+client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=DefaultAsyncHttpxClient(
+        http2=HTTP2,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+    ),
+)
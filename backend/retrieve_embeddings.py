@@ -4,14 +4,22 @@ retrieve_embeddings.py
 Lightweight semantic search engine for the RAG knowledge store.
 """
 
+import asyncio
+import base64
 import os
-import json
 from pathlib import Path
 from typing import List, Dict, Optional
 
 import numpy as np
-from dotenv import load_dotenv
-from openai import OpenAI
+import openai
+import orjson
+
+from backend.openai_client import client
+
+try:
+    import faiss  # optional: SIMD index; NumPy search is used without it
+except ImportError:
+    faiss = None
 
 # ------------------------------------------
 # CONFIG
@@ -20,13 +28,121 @@ ROOT = Path(__file__).resolve().parents[1]
 LOCAL_ROOT = Path(__file__).resolve().parents[0]   # backend/
 STORE_PATH = LOCAL_ROOT / "knowledge_store.jsonl"
 EMBED_MODEL = "text-embedding-3-large"
+SEARCH_BLOCK_ROWS = 4096   # rows of the store upcast per similarity block
+EMBED_BATCH_MAX = 64       # max texts coalesced into one embeddings call
+EMBED_BATCH_WAIT = 0.01    # seconds to wait for more texts before flushing
+HNSW_MIN_ROWS = 50_000     # switch FAISS from exact to HNSW above this size
+
+
+def _replace_atomically(path: Path, write):
+    """
+    Write via a per-process temp file + os.replace, so concurrent uvicorn
+    workers building the same sidecar never mmap a half-written file.
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _record_embedding(rec: Dict) -> np.ndarray:
+    """Pop and decode a record's vector (base64 or legacy float list)."""
+    if "embedding_b64" in rec:
+        rec.pop("embedding_dim", None)
+        raw = base64.b64decode(rec.pop("embedding_b64"))
+        return np.frombuffer(raw, dtype=rec.pop("embedding_dtype", "float16"))
+    return np.asarray(rec.pop("embedding"), dtype=np.float32)
+
+
+# ------------------------------------------
+# EMBEDDING MICRO-BATCHER
+# ------------------------------------------
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embed requests into a single embeddings API call.
+
+    Requests arriving within EMBED_BATCH_WAIT of each other (up to
+    EMBED_BATCH_MAX) share one HTTP round trip; each caller awaits its own
+    future. start()/stop() are called from the FastAPI lifespan.
+    """
+
+    def __init__(self, max_batch: int = EMBED_BATCH_MAX, max_wait: float = EMBED_BATCH_WAIT):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def embed(self, text: str) -> np.ndarray:
+        if self._queue is None:
+            raise RuntimeError("Call .start() before embed().")
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Flush in the background so the next batch can start filling
+            task = asyncio.create_task(self._flush(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
 
-load_dotenv(LOCAL_ROOT / ".env")
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise RuntimeError("Missing OPENAI_API_KEY in backend/.env")
+    async def _flush(self, batch):
+        try:
+            resp = await client.embeddings.create(
+                model=EMBED_MODEL,
+                input=[text for text, _ in batch],
+            )
+        except openai.BadRequestError as e:
+            if len(batch) == 1:
+                fut = batch[0][1]
+                if not fut.done():
+                    fut.set_exception(e)
+                return
+            # A 400 is about some input (e.g. over the model's token limit):
+            # embed the texts one by one so only the offending caller fails
+            await asyncio.gather(*(self._flush([item]) for item in batch))
+            return
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for item in resp.data:
+            fut = batch[item.index][1]
+            if not fut.done():
+                fut.set_result(np.array(item.embedding, dtype="float32"))
 
-client = OpenAI(api_key=api_key)
+        # A short response must not leave callers awaiting forever
+        for _, fut in batch:
+            if not fut.done():
+                fut.set_exception(RuntimeError("Embeddings response is missing this input."))
 
 
 # ------------------------------------------
@@ -35,58 +151,183 @@ client = OpenAI(api_key=api_key)
 class KnowledgeStore:
     """
     Loads embeddings from knowledge_store.jsonl and enables vector search.
+
+    On first load the JSONL is split into sidecars next to it:
+        knowledge_store.q8.npy      L2-normalized rows quantized to int8 (N x D)
+        knowledge_store.scale.npy   per-row float32 dequantization scale (N,)
+        knowledge_store.meta.jsonl  one record per row, without the embedding
+        knowledge_store.faiss       FAISS index over the rows (faiss installed only)
+    Later loads memory-map the matrices and the index, and only parse the
+    small metadata file.
+    The mappings are read-only and file-backed, so every worker process
+    shares the same physical pages through the OS page cache.
+    The sidecars are rebuilt whenever the JSONL is newer than them, and the
+    index whenever the int8 matrix is newer than it.
     """
 
     def __init__(self, path: Path = STORE_PATH):
         self.path = Path(path)
+        self.q8_path = self.path.with_suffix(".q8.npy")
+        self.scale_path = self.path.with_suffix(".scale.npy")
+        self.meta_path = self.path.with_suffix(".meta.jsonl")
+        self.index_path = self.path.with_suffix(".faiss")
         self.records: List[Dict] = []
-        self.embeddings: Optional[np.ndarray] = None
+        self.q8_embeddings: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.index = None   # FAISS index, when faiss is installed
+        self.batcher: Optional[EmbeddingBatcher] = None
+
+    def _sidecar_is_fresh(self) -> bool:
+        src_mtime = self.path.stat().st_mtime
+        return all(
+            p.exists() and p.stat().st_mtime >= src_mtime
+            for p in (self.q8_path, self.scale_path, self.meta_path)
+        )
+
+    def _build_sidecar(self):
+        """Parse the JSONL once and write the matrix + metadata sidecars."""
+        # First pass: row count, so the matrix is allocated exactly once
+        with self.path.open("rb") as f:
+            n = sum(1 for _ in f)
+
+        emb: Optional[np.ndarray] = None
+        meta: List[bytes] = []
+
+        with self.path.open("rb") as f:
+            for i, line in enumerate(f):
+                rec = orjson.loads(line)
+                vec = _record_embedding(rec)
+                if emb is None:
+                    emb = np.empty((n, len(vec)), dtype=np.float32)
+                emb[i] = vec
+                meta.append(orjson.dumps(rec) + b"\n")
+
+        emb /= np.linalg.norm(emb, axis=1, keepdims=True) + 1e-12
+
+        # Symmetric int8 quantization with one scale per row
+        scale = np.maximum(np.abs(emb).max(axis=1), 1e-12) / 127
+        q8 = np.round(emb / scale[:, None]).astype(np.int8)
+        _replace_atomically(self.q8_path, lambda f: np.save(f, q8))
+        _replace_atomically(self.scale_path, lambda f: np.save(f, scale.astype(np.float32)))
+        _replace_atomically(self.meta_path, lambda f: f.writelines(meta))
 
     def load(self):
-        """Load all JSONL chunks + embeddings into memory."""
+        """Load chunk metadata + the memory-mapped quantized matrix."""
         if not self.path.exists():
             raise FileNotFoundError(f"Knowledge store missing: {self.path}")
 
-        self.records = []
-        vectors = []
+        if not self._sidecar_is_fresh():
+            self._build_sidecar()
 
-        with self.path.open("r", encoding="utf-8") as f:
-            for line in f:
-                rec = json.loads(line)
-                self.records.append(rec)
-                vectors.append(rec["embedding"])
+        with self.meta_path.open("rb") as f:
+            self.records = [orjson.loads(line) for line in f]
 
-        self.embeddings = np.array(vectors, dtype="float32")
+        self.q8_embeddings = np.load(self.q8_path, mmap_mode="r")
+        self.scales = np.load(self.scale_path, mmap_mode="r")
+        if faiss is not None:
+            if not self._index_is_fresh():
+                self._build_index()
+            # Memory-mapped like the matrices, so workers share its pages
+            self.index = faiss.read_index(str(self.index_path), faiss.IO_FLAG_MMAP)
         print(f"[KnowledgeStore] Loaded {len(self.records)} chunks.")
 
-    def embed_query(self, text: str) -> np.ndarray:
-        """Embed a query using OpenAI embeddings."""
-        resp = client.embeddings.create(model=EMBED_MODEL, input=[text])
+    def _index_is_fresh(self) -> bool:
+        return (
+            self.index_path.exists()
+            and self.index_path.stat().st_mtime >= self.q8_path.stat().st_mtime
+        )
+
+    def _build_index(self):
+        """
+        Build the 8-bit scalar-quantized inner-product FAISS index (= cosine)
+        once and write it next to the other sidecars.
+        """
+        n, dim = self.q8_embeddings.shape
+        qt = faiss.ScalarQuantizer.QT_8bit
+        if n >= HNSW_MIN_ROWS:
+            index = faiss.IndexHNSWSQ(dim, qt, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efSearch = 64
+        else:
+            index = faiss.IndexScalarQuantizer(dim, qt, faiss.METRIC_INNER_PRODUCT)
+        rows = self.q8_embeddings.astype(np.float32) * self.scales[:, None]
+        index.train(rows)
+        index.add(rows)
+        _replace_atomically(self.index_path, lambda f: f.write(faiss.serialize_index(index)))
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        """Embed a query using OpenAI embeddings (micro-batched if a batcher is attached)."""
+        if self.batcher is not None:
+            return await self.batcher.embed(text)
+        resp = await client.embeddings.create(model=EMBED_MODEL, input=[text])
         return np.array(resp.data[0].embedding, dtype="float32")
 
-    def retrieve(self, query: str, k: int = 5):
+    async def retrieve(self, query: str, k: int = 5):
         """
         Return top-k most similar chunks for the query.
         """
-        if self.embeddings is None:
+        q = await self.embed_query(query)
+        return self.search(q, k)
+
+    def search(self, q: np.ndarray, k: int = 5):
+        """
+        Return top-k most similar chunks for an already-embedded query.
+
+        Pure CPU work; async callers run it via asyncio.to_thread.
+        """
+        return self.search_many(q.reshape(1, -1), k)[0]
+
+    def search_many(self, queries: np.ndarray, k: int = 5) -> List[List[Dict]]:
+        """
+        Top-k search for a (Q, D) batch of embedded queries.
+
+        Each SEARCH_BLOCK_ROWS block of the store is read once and multiplied
+        against all Q queries as a single (B, D) @ (D, Q) GEMM, so the queries
+        share the pass over the matrix instead of each streaming it from RAM.
+        """
+        if self.q8_embeddings is None:
             raise RuntimeError("Call .load() first.")
 
-        q = self.embed_query(query)
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12)
+        n = self.q8_embeddings.shape[0]
+        k = min(k, n)
+
+        if self.index is not None:
+            scores, ids = self.index.search(queries, k)
+            hits = [
+                [(int(i), float(s)) for i, s in zip(row_ids, row_scores) if i >= 0]
+                for row_ids, row_scores in zip(ids, scores)
+            ]
+        else:
+            # Cosine similarity (store rows are already unit length). The int8
+            # matrix is upcast one block at a time so the temporary stays small,
+            # and the per-row scale is applied to the block's dot products.
+            qt = np.ascontiguousarray(queries.T)
+            sims = np.empty((n, queries.shape[0]), dtype=np.float32)
+            for i in range(0, n, SEARCH_BLOCK_ROWS):
+                block = self.q8_embeddings[i:i + SEARCH_BLOCK_ROWS]
+                sims[i:i + SEARCH_BLOCK_ROWS] = (
+                    (block.astype(np.float32) @ qt)
+                    * self.scales[i:i + SEARCH_BLOCK_ROWS, None]
+                )
 
-        # Normalize
-        norm_store = self.embeddings / np.linalg.norm(self.embeddings, axis=1, keepdims=True)
-        norm_query = q / np.linalg.norm(q)
+            # Partial top-k selection per query, then sort only those k
+            part = np.argpartition(-sims, k - 1, axis=0)[:k]
+            hits = []
+            for col in range(sims.shape[1]):
+                col_sims = sims[:, col]
+                top = part[:, col][np.argsort(-col_sims[part[:, col]])]
+                hits.append([(int(i), float(col_sims[i])) for i in top])
 
-        # Cosine similarity
-        sims = norm_store @ norm_query
-        ranked = np.argsort(-sims)
+        return [self._to_results(row) for row in hits]
 
+    def _to_results(self, hits) -> List[Dict]:
         results = []
-        for idx in ranked[:k]:
+        for idx, score in hits:
             rec = self.records[idx]
             results.append(
                 {
-                    "score": float(sims[idx]),
+                    "score": score,
                     "category": rec.get("category", "unknown"),
                     "attack_type": rec.get("attack_type"),
                     "source": rec.get("source_path", rec.get("source")),
@@ -2,52 +2,89 @@
 """
 classify_all.py
 
-Runs BOTH classify_raw.py and classify_rag.py
+Runs BOTH classify_raw and classify_rag
 on EVERY contract folder under data/synthetic/*/*.
+
+Both classifiers are imported once and run in-process on a thread pool
+(the work is almost entirely waiting on OpenAI), and the knowledge store
+is loaded a single time and shared by every RAG call.
 """
 
-import subprocess
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[2]
 print(f"ROOT IS {ROOT}")
 SYN = ROOT / "data" / "synthetic"
 
-RAW_SCRIPT = ROOT / "scripts" / "classification" / "classify_raw.py"
-RAG_SCRIPT = ROOT / "scripts" / "classification" / "classify_rag.py"
-
-MODEL = "gpt-5.1"
-
+sys.path.insert(0, str(ROOT / "scripts" / "classification"))
+import classify_raw
+import classify_rag
 
-def run(cmd):
-    print(" ".join(str(x) for x in cmd))
-    subprocess.run(cmd, check=True)
+DEFAULT_MODEL = "gpt-5.1"
+MAX_WORKERS = 16
 
 
 def main():
-    for category in SYN.iterdir():
-        if not category.is_dir():
-            continue
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL,
+                        help="Model used by both classifiers")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-run RAW on contracts that already have a result "
+                             "from this model (RAG always re-runs)")
+    args = parser.parse_args()
 
-        for contract_dir in category.iterdir():
-            if not contract_dir.is_dir():
-                continue
+    contract_dirs = [
+        contract_dir
+        for category in sorted(SYN.iterdir()) if category.is_dir()
+        for contract_dir in sorted(category.iterdir()) if contract_dir.is_dir()
+    ]
 
-            print(f"\n=== CLASSIFYING {contract_dir.name} ===")
+    ks = classify_rag.KnowledgeStore(path=classify_rag.DEFAULT_STORE_PATH)
+    ks.load()
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {}
+        for contract_dir in contract_dirs:
+            contract_path = contract_dir / "malicious.sol"
 
             # RAW
-            run([
-                "uv", "run", "python", str(RAW_SCRIPT),
-                str(contract_dir),
-                "--model", MODEL
-            ])
+            futures[pool.submit(
+                classify_raw.classify_raw_contract,
+                contract_path=contract_path,
+                contract_id=contract_dir.name,
+                model=args.model,
+                out_path=contract_dir / "classify_raw.json",
+                force=args.force,
+            )] = ("RAW", contract_dir)
 
             # RAG
-            run([
-                "uv", "run", "python", str(RAG_SCRIPT),
-                str(contract_dir),
-                "--model", MODEL
-            ])
+            futures[pool.submit(
+                classify_rag.classify_with_rag,
+                contract_path=contract_path,
+                contract_id=contract_dir.name,
+                model=args.model,
+                k=classify_rag.DEFAULT_K,
+                store_path=classify_rag.DEFAULT_STORE_PATH,
+                prompt_path=classify_rag.DEFAULT_PROMPT_PATH,
+                outdir=contract_dir,
+                ks=ks,
+            )] = ("RAG", contract_dir)
+
+        failed = 0
+        for fut in as_completed(futures):
+            mode, contract_dir = futures[fut]
+            try:
+                fut.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{mode}] FAILED {contract_dir.name}: {e}")
+
+    print(f"\nClassified {len(contract_dirs)} contracts ({failed} failed runs).")
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -39,7 +39,7 @@ import argparse
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import sys
 from dotenv import load_dotenv
@@ -53,7 +53,7 @@ sys.path.insert(0, str(RELATIVE_ROOT / "scripts" / "embeddings"))
 from retrieve_embeddings import KnowledgeStore
 
 
-ALLOWED_ATTACK_TYPES = [
+ALLOWED_ATTACK_TYPES = frozenset({
     "access_control",
     "arithmetic",
     "denial_of_service",
@@ -64,9 +64,9 @@ ALLOWED_ATTACK_TYPES = [
     "unchecked_return_value",
     "unencrypted_private_data",
     "unprotected_self_destruct",
-]
+})
 
-ALLOWED_SEVERITIES = ["low", "medium", "high"]
+ALLOWED_SEVERITIES = frozenset({"low", "medium", "high"})
 
 DEFAULT_MODEL = "gpt-4.1-mini"
 DEFAULT_K = 5
@@ -214,6 +214,7 @@ def classify_with_rag(
     store_path: Path,
     prompt_path: Path,
     outdir: Path,
+    ks: Optional[KnowledgeStore] = None,
 ) -> None:
     load_dotenv(ROOT / ".env")
     api_key = os.getenv("OPENAI_API_KEY")
@@ -225,12 +226,14 @@ def classify_with_rag(
     # Load contract
     contract_text = load_contract(contract_path)
 
-    # Load RAG store
-    ks = KnowledgeStore(path=store_path)
-    ks.load()
+    # Load RAG store (unless the caller already holds one, e.g. classify_all.py)
+    if ks is None:
+        ks = KnowledgeStore(path=store_path)
+        ks.load()
 
-    # Retrieve docs
-    hits = ks.retrieve(contract_text, k=k)
+    # Retrieve docs (embed once, then search by vector)
+    q = ks.embed_query(contract_text)
+    hits = ks.search(q, k=k)
     retrieved_docs_block, rag_refs = build_retrieved_docs_block(hits)
 
     # Prepare prompt
@@ -48,16 +48,49 @@ Examples:
     uv run python scripts/classification/classify_raw.py \
         path/to/SomeContract.sol \
         --model gpt-5.1
+
+    # Bulk: every synthetic contract, 16 requests in flight
+    uv run python scripts/classification/classify_raw.py \
+        --all \
+        --concurrency 16
+
+    # Bulk: targets listed one per line
+    uv run python scripts/classification/classify_raw.py \
+        --targets-file targets.txt
+
+    # Bulk, 4 contracts per prompt (shares the fixed instructions)
+    uv run python scripts/classification/classify_raw.py \
+        --all \
+        --pack 4
+
+    # Bulk through the OpenAI Batch API (~50% cheaper, up to 24h)
+    uv run python scripts/classification/classify_raw.py \
+        --all \
+        --batch-api
 """
 
 import argparse
-import json
+import asyncio
+import functools
+import hashlib
+import orjson
 import os
+import sys
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
-from openai import OpenAI
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+    OpenAI,
+    RateLimitError,
+)
 
 # ---------------------------------------------------------------------
 # Project root and constants
@@ -66,8 +99,13 @@ from openai import OpenAI
 RELATIVE_ROOT = Path(__file__).resolve().parents[2]
 SYNTHETIC_ROOT = RELATIVE_ROOT / "data" / "synthetic"
 PROMPT_PATH = RELATIVE_ROOT / "prompts" / "classify_raw.txt"
+PACKED_PROMPT_PATH = RELATIVE_ROOT / "prompts" / "classify_raw_multi.txt"
+RESPONSE_CACHE_DIR = RELATIVE_ROOT / "data" / "cache" / "classify_raw"
+
+# Loaded once per process; load_api_key() only reads the environment
+load_dotenv(RELATIVE_ROOT / ".env")
 
-ALLOWED_ATTACK_TYPES = [
+ALLOWED_ATTACK_TYPES = frozenset({
     "access_control",
     "arithmetic",
     "denial_of_service",
@@ -78,11 +116,33 @@ ALLOWED_ATTACK_TYPES = [
     "unchecked_return_value",
     "unencrypted_private_data",
     "unprotected_self_destruct",
-]
+})
 
-ALLOWED_SEVERITIES = ["low", "medium", "high"]
+ALLOWED_SEVERITIES = frozenset({"low", "medium", "high"})
 
 DEFAULT_MODEL = "gpt-4.1-mini"
+DEFAULT_CONCURRENCY = 16
+BATCH_POLL_SECONDS = 30
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+
+# Starting limits for the token buckets; corrected from the
+# x-ratelimit-* headers of the first response.
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200_000
+MAX_ATTEMPTS = 5
+BATCH_TERMINAL_STATES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+SYSTEM_PROMPT = (
+    "You are a strict smart contract vulnerability classifier. "
+    "You must follow the prompt instructions exactly and output ONLY JSON."
+)
+
+PACKED_SYSTEM_PROMPT = (
+    "You are a strict smart contract vulnerability classifier. "
+    "You must follow the prompt instructions exactly and output ONLY JSON: "
+    'an object {"results": [{id, solidity, attacks}, ...]} with one entry '
+    "per contract, in the order given."
+)
 
 
 # ---------------------------------------------------------------------
@@ -102,11 +162,18 @@ def load_contract(path: Path) -> str:
     return "\n".join(f"{i + 1}: {line}" for i, line in enumerate(lines))
 
 
+@functools.lru_cache(maxsize=1)
 def load_prompt_template() -> str:
-    """Load the classify_raw.txt prompt template."""
+    """Load the classify_raw.txt prompt template (read once per process)."""
     return PROMPT_PATH.read_text(encoding="utf-8")
 
 
+@functools.lru_cache(maxsize=1)
+def load_packed_prompt_template() -> str:
+    """Load the classify_raw_multi.txt prompt template (read once per process)."""
+    return PACKED_PROMPT_PATH.read_text(encoding="utf-8")
+
+
 def fill_prompt_template(
     template: str,
     contract_text: str,
@@ -124,6 +191,21 @@ def fill_prompt_template(
     return prompt
 
 
+def build_packed_prompt(contracts: List[Tuple[str, str]]) -> str:
+    """
+    Fill classify_raw_multi.txt with several (contract_id, numbered source)
+    pairs, each fenced as:
+        --- ID: <contract_id> ---
+        <numbered source>
+        --- END ---
+    """
+    blocks = "\n\n".join(
+        f"--- ID: {contract_id} ---\n{contract_text}\n--- END ---"
+        for contract_id, contract_text in contracts
+    )
+    return load_packed_prompt_template().replace("{contracts}", blocks)
+
+
 def resolve_contract_target(target: str) -> Tuple[Path, str, Path]:
     """
     Resolve the user-provided target into:
@@ -239,12 +321,12 @@ def validate_output(data: Dict[str, Any], contract_id: str) -> Tuple[bool, List[
 
         if t not in ALLOWED_ATTACK_TYPES:
             errors.append(
-                f"Attack[{i}].type '{t}' not in allowed types {ALLOWED_ATTACK_TYPES}"
+                f"Attack[{i}].type '{t}' not in allowed types {sorted(ALLOWED_ATTACK_TYPES)}"
             )
 
         if sev not in ALLOWED_SEVERITIES:
             errors.append(
-                f"Attack[{i}].severity '{sev}' not in {ALLOWED_SEVERITIES}"
+                f"Attack[{i}].severity '{sev}' not in {sorted(ALLOWED_SEVERITIES)}"
             )
 
         if not isinstance(lines, list) or not all(isinstance(x, int) for x in lines):
@@ -266,81 +348,702 @@ def validate_output(data: Dict[str, Any], contract_id: str) -> Tuple[bool, List[
 # Core classification logic
 # ---------------------------------------------------------------------
 
-def classify_raw_contract(
-    contract_path: Path,
-    contract_id: str,
-    model: str,
-    out_path: Path,
-) -> None:
-    """
-    Run LLM-only classification on a single contract.
-
-    Steps:
-        1. Load and line-number the contract.
-        2. Load the classify_raw.txt prompt.
-        3. Fill {contract} and {contract_id}.
-        4. Call OpenAI chat completion in JSON mode.
-        5. Validate and write <...>_raw.json.
-    """
-    # Load env and create client once per run
-    load_dotenv(RELATIVE_ROOT / ".env")
+def load_api_key() -> str:
+    """OPENAI_API_KEY (research/.env is loaded at import)."""
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY not set in .env")
+    return api_key
+
 
-    client = OpenAI(api_key=api_key)
+@functools.lru_cache(maxsize=1)
+def get_client() -> OpenAI:
+    """
+    Process-wide sync client, so every call in a run (and every
+    classify_all thread) reuses one keep-alive connection pool.
+    """
+    return OpenAI(
+        api_key=load_api_key(),
+        http_client=DefaultHttpxClient(
+            limits=httpx.Limits(max_keepalive_connections=64, max_connections=64),
+            timeout=60,
+        ),
+    )
 
-    # 1) Contract text
-    contract_text = load_contract(contract_path)
 
-    # 2) Prompt template
-    template = load_prompt_template()
-    prompt = fill_prompt_template(
-        template=template,
-        contract_text=contract_text,
+def make_async_client(concurrency: int, **kwargs) -> AsyncOpenAI:
+    """
+    AsyncOpenAI whose connection pool matches the run's concurrency.
+    Async clients are bound to their event loop, so each bulk run makes
+    its own instead of sharing a module-level one.
+    """
+    return AsyncOpenAI(
+        api_key=load_api_key(),
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_keepalive_connections=concurrency,
+                max_connections=concurrency,
+            ),
+            timeout=60,
+        ),
+        **kwargs,
+    )
+
+
+def build_prompt(contract_path: Path, contract_id: str) -> str:
+    """Line-number the contract and fill the classify_raw.txt template."""
+    return fill_prompt_template(
+        template=load_prompt_template(),
+        contract_text=load_contract(contract_path),
         contract_id=contract_id,
     )
 
-    # 3) Call model with JSON output enforced
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a strict smart contract vulnerability classifier. "
-                    "You must follow the prompt instructions exactly and output ONLY JSON."
-                ),
-            },
+
+def completion_request(model: str, prompt: str, system: str = SYSTEM_PROMPT) -> Dict[str, Any]:
+    """Keyword arguments for chat.completions.create (JSON mode)."""
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system},
             {"role": "user", "content": prompt},
         ],
-        response_format={"type": "json_object"},
-        temperature=0.0,
-    )
+        "response_format": {"type": "json_object"},
+        "temperature": 0.0,
+    }
+
+
+def stream_completion(client: OpenAI, model: str, prompt: str) -> str:
+    """
+    Stream the completion, echoing tokens to stderr as they arrive.
+
+    JSON mode output must start with "{", so anything else is aborted
+    as soon as the first non-whitespace token shows up.
+    """
+    stream = client.chat.completions.create(**completion_request(model, prompt), stream=True)
+
+    buf: List[str] = []
+    checked = False
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+
+            buf.append(delta)
+            sys.stderr.write(delta)
+            sys.stderr.flush()
+
+            if not checked and "".join(buf).strip():
+                checked = True
+                if not "".join(buf).lstrip().startswith("{"):
+                    raise RuntimeError(
+                        f"Model output does not start with a JSON object: {''.join(buf)!r}"
+                    )
+    finally:
+        stream.close()
+        sys.stderr.write("\n")
+
+    return "".join(buf)
+
+
+def response_cache_path(model: str, prompt: str) -> Path:
+    """
+    On-disk cache entry for a model response. The filled prompt already
+    contains the template, contract source, and contract id.
+    """
+    key = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+    return RESPONSE_CACHE_DIR / f"{key}.json"
+
+
+def load_cached_response(model: str, prompt: str) -> Optional[str]:
+    path = response_cache_path(model, prompt)
+    return path.read_text(encoding="utf-8") if path.exists() else None
+
+
+def response_is_valid(raw_content: Optional[str], contract_id: str) -> bool:
+    """True if raw_content parses as JSON and passes validate_output."""
+    if raw_content is None:
+        return False
+    try:
+        ok, _ = validate_output(orjson.loads(raw_content), contract_id)
+    except (orjson.JSONDecodeError, AttributeError, TypeError):
+        return False
+    return ok
+
+
+def load_valid_cached_response(model: str, prompt: str, contract_id: str) -> Optional[str]:
+    """
+    Cached response for this prompt, or None if there is none or it does
+    not validate (so a bad reply is asked for again instead of replayed).
+    """
+    raw_content = load_cached_response(model, prompt)
+    return raw_content if response_is_valid(raw_content, contract_id) else None
 
-    raw_content = resp.choices[0].message.content
 
-    # 4) Parse JSON
+def store_cached_response(model: str, prompt: str, raw_content: str) -> None:
+    """Cache a response. Callers only store replies that parsed and validated."""
+    path = response_cache_path(model, prompt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(raw_content, encoding="utf-8")
+
+
+def parse_model_json(raw_content: Optional[str]) -> Any:
+    if raw_content is None:
+        raise RuntimeError("Model returned no content")
     try:
-        data = json.loads(raw_content)
-    except json.JSONDecodeError as e:
+        return orjson.loads(raw_content)
+    except orjson.JSONDecodeError as e:
         raise RuntimeError(
             f"Model output was not valid JSON. Error: {e}\nRaw content:\n{raw_content}"
         )
 
-    # 5) Validate
+
+def write_raw_result(
+    raw_content: Optional[str], contract_id: str, out_path: Path, model: str
+) -> bool:
+    """
+    Parse the model output, validate it, and write it to out_path.
+    Returns whether it passed validation.
+    """
+    return write_raw_data(parse_model_json(raw_content), contract_id, out_path, model)
+
+
+def write_raw_data(data: Dict[str, Any], contract_id: str, out_path: Path, model: str) -> bool:
+    """
+    Validate one classification object and write it to out_path, tagged
+    with the model that produced it. Returns whether it passed validation.
+    """
     ok, errors = validate_output(data, contract_id)
     if not ok:
-        print("WARNING: Output did not fully pass validation:")
+        print(f"WARNING: {contract_id} output did not fully pass validation:")
         for err in errors:
             print("  -", err)
 
-    # 6) Write to disk
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    with out_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    out_path.write_bytes(orjson.dumps({**data, "model": model}, option=orjson.OPT_INDENT_2))
 
     print(f"[classify_raw] Wrote RAW classification JSON to {out_path}")
+    return ok
+
+
+def already_classified(contract_id: str, out_path: Path, model: str) -> bool:
+    """
+    True if out_path already holds a valid result from this model. Results
+    from another model (or written before the model was recorded) are redone.
+    """
+    if not out_path.exists():
+        return False
+    try:
+        data = orjson.loads(out_path.read_bytes())
+        ok, _ = validate_output(data, contract_id)
+    except (orjson.JSONDecodeError, AttributeError, TypeError):
+        return False
+    return ok and data.get("model") == model
+
+
+def classify_raw_contract(
+    contract_path: Path,
+    contract_id: str,
+    model: str,
+    out_path: Path,
+    use_cache: bool = False,
+    stream: bool = False,
+    force: bool = False,
+) -> None:
+    """
+    Run LLM-only classification on a single contract.
+
+    Skips the contract if out_path already holds a valid result from the
+    same model, unless force=True, so interrupted bulk runs can simply be restarted.
+
+    Steps:
+        1. Load and line-number the contract.
+        2. Load the classify_raw.txt prompt.
+        3. Fill {contract} and {contract_id}.
+        4. Call OpenAI chat completion in JSON mode
+           (with use_cache=True, skipped if this exact prompt + model
+           is cached and force is not set;
+           with stream=True tokens are echoed to stderr as they arrive).
+        5. Validate and write <...>_raw.json.
+    """
+    if not force and already_classified(contract_id, out_path, model):
+        print(f"[SKIP] {out_path} already classified")
+        return
+
+    prompt = build_prompt(contract_path, contract_id)
+
+    cached = None
+    if use_cache and not force:
+        cached = load_valid_cached_response(model, prompt, contract_id)
+    raw_content = cached
+    if raw_content is None:
+        client = get_client()
+        if stream:
+            raw_content = stream_completion(client, model, prompt)
+        else:
+            resp = client.chat.completions.create(**completion_request(model, prompt))
+            raw_content = resp.choices[0].message.content
+
+    # Only replies that parse and validate are cached
+    valid = write_raw_result(raw_content, contract_id, out_path, model)
+    if valid and use_cache and cached is None:
+        store_cached_response(model, prompt, raw_content)
+
+
+def group_duplicate_targets(targets: List[str]) -> List[Tuple[str, List[Tuple[str, Path]]]]:
+    """
+    Resolve targets and group them by sha256 of their numbered source.
+
+    Returns one (prompt, [(contract_id, out_path), ...]) per unique source;
+    the prompt is filled with the group's first contract_id.
+    """
+    groups: Dict[bytes, Tuple[str, List[Tuple[str, Path]]]] = {}
+    for target in targets:
+        contract_path, contract_id, out_path = resolve_contract_target(target)
+        contract_text = load_contract(contract_path)
+        key = hashlib.sha256(contract_text.encode("utf-8")).digest()
+        if key not in groups:
+            prompt = fill_prompt_template(load_prompt_template(), contract_text, contract_id)
+            groups[key] = (prompt, [])
+        groups[key][1].append((contract_id, out_path))
+    return list(groups.values())
+
+
+def write_group_result(
+    raw_content: Optional[str], members: List[Tuple[str, Path]], model: str
+) -> bool:
+    """
+    Write one model response to every contract in a duplicate group.
+    The first member is the one the prompt was built for; the others get
+    a copy with "id" patched. Returns whether the response validated.
+    """
+    data = parse_model_json(raw_content)
+    ok = True
+    for n, (contract_id, out_path) in enumerate(members):
+        member_data = data if n == 0 else {**data, "id": contract_id}
+        ok = write_raw_data(member_data, contract_id, out_path, model) and ok
+    return ok
+
+
+# ---------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------
+
+class RateLimited(Exception):
+    """HTTP 429 from the API; retry_after is the server's hint in seconds."""
+
+    def __init__(self, retry_after: Optional[float]):
+        super().__init__(f"rate limited (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+
+class TransientError(Exception):
+    """Timeout, dropped connection, or 408/409/5xx: worth retrying."""
+
+
+# The same statuses the SDK's own retry logic treats as transient
+TRANSIENT_STATUSES = frozenset({408, 409})
+
+
+def is_transient_status(status: int) -> bool:
+    return status in TRANSIENT_STATUSES or status >= 500
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    if headers.get("retry-after-ms"):
+        return float(headers["retry-after-ms"]) / 1000
+    if headers.get("retry-after"):
+        return float(headers["retry-after"])
+    return None
+
+
+class RateLimiter:
+    """
+    Two token buckets, requests/min and tokens/min, refilled continuously.
+
+    acquire() waits until both buckets can cover a request. update() lowers
+    the local counts to the x-ratelimit-remaining-* values the server
+    reports (and adopts its x-ratelimit-limit-* values), so the buckets
+    track the account's real budget instead of the defaults. pause() holds
+    every caller after a 429.
+    """
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = rpm
+        self.tokens = tpm
+        self.last = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed, self.last = now - self.last, now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int):
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                pause = self.paused_until - time.monotonic()
+                if pause <= 0 and self.requests >= 1 and self.tokens >= tokens:
+                    self.requests -= 1
+                    self.tokens -= tokens
+                    return
+                wait_requests = (1 - self.requests) * 60 / self.rpm
+                wait_tokens = (tokens - self.tokens) * 60 / self.tpm
+                await asyncio.sleep(max(pause, wait_requests, wait_tokens, 0.01))
+
+    def update(self, headers):
+        if headers.get("x-ratelimit-limit-requests"):
+            self.rpm = float(headers["x-ratelimit-limit-requests"])
+        if headers.get("x-ratelimit-limit-tokens"):
+            self.tpm = float(headers["x-ratelimit-limit-tokens"])
+        if headers.get("x-ratelimit-remaining-requests"):
+            self.requests = min(self.requests, float(headers["x-ratelimit-remaining-requests"]))
+        if headers.get("x-ratelimit-remaining-tokens"):
+            self.tokens = min(self.tokens, float(headers["x-ratelimit-remaining-tokens"]))
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+async def classify_raw_many(
+    targets: List[str],
+    model: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_cache: bool = False,
+    raw_http: bool = False,
+    rpm: float = DEFAULT_RPM,
+    tpm: float = DEFAULT_TPM,
+) -> int:
+    """
+    Classify many targets with up to `concurrency` requests in flight.
+
+    Paths are resolved and prompts filled up front (local and fast), then
+    every API call is launched at once behind a semaphore. A failing
+    contract is reported and skipped rather than aborting the run.
+
+    Targets with byte-identical (numbered) source are classified once; the
+    result is copied to every sibling with its "id" rewritten locally.
+
+    With raw_http=True the requests are POSTed straight to
+    /v1/chat/completions over an aiohttp connection pool sized to
+    `concurrency`, bypassing the SDK's httpx client, which degrades at
+    high fan-out. Requires the optional `aiohttp` package.
+
+    Calls go through a RateLimiter (rpm/tpm token buckets kept in sync
+    with the x-ratelimit-* headers); a 429 pauses all callers for the
+    server's Retry-After (or exponential backoff). Timeouts, dropped
+    connections and 408/409/5xx responses back off only the failing call.
+    Either way a request gets up to MAX_ATTEMPTS attempts. Progress and an
+    ETA are logged to stderr.
+
+    Returns the number of failed contracts.
+    """
+    jobs = group_duplicate_targets(targets)
+    total = sum(len(members) for _, members in jobs)
+    if len(jobs) < total:
+        print(f"[classify_raw] {total} contracts, {len(jobs)} unique sources")
+
+    api_key = load_api_key()
+    if raw_http:
+        import aiohttp  # optional: only needed for --raw-http
+
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency),
+            headers={"Authorization": f"Bearer {api_key}"},
+        )
+
+        async def complete(prompt: str) -> str:
+            try:
+                async with session.post(OPENAI_CHAT_URL, json=completion_request(model, prompt)) as r:
+                    if r.status == 429:
+                        raise RateLimited(retry_after_seconds(r.headers))
+                    if r.status != 200:
+                        message = f"HTTP {r.status}: {(await r.text())[:300]}"
+                        if is_transient_status(r.status):
+                            raise TransientError(message)
+                        raise RuntimeError(message)
+                    limiter.update(r.headers)
+                    data = await r.json()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                raise TransientError(f"{type(e).__name__}: {e}")
+            return data["choices"][0]["message"]["content"]
+
+        close = session.close
+    else:
+        # Retries (429s with the limiter, and transient errors) are handled
+        # below rather than by the SDK, so they share one attempt budget
+        client = make_async_client(concurrency, max_retries=0)
+
+        async def complete(prompt: str) -> str:
+            try:
+                raw = await client.chat.completions.with_raw_response.create(
+                    **completion_request(model, prompt)
+                )
+            except RateLimitError as e:
+                raise RateLimited(retry_after_seconds(e.response.headers))
+            except APIConnectionError as e:  # includes timeouts
+                raise TransientError(f"{type(e).__name__}: {e}")
+            except APIStatusError as e:
+                if is_transient_status(e.status_code):
+                    raise TransientError(f"HTTP {e.status_code}: {e}")
+                raise
+            limiter.update(raw.headers)
+            return raw.parse().choices[0].message.content
+
+        close = client.close
+
+    limiter = RateLimiter(rpm, tpm)
+    sem = asyncio.Semaphore(concurrency)
+    started = time.monotonic()
+    done = 0
+
+    async def call(prompt: str) -> str:
+        for attempt in range(MAX_ATTEMPTS):
+            await limiter.acquire(len(prompt) // 4)
+            try:
+                return await complete(prompt)
+            except RateLimited as e:
+                delay = e.retry_after if e.retry_after is not None else 2 ** attempt
+                limiter.pause(delay)
+                print(f"[classify_raw] 429, pausing {delay:.1f}s "
+                      f"(attempt {attempt + 1}/{MAX_ATTEMPTS})", file=sys.stderr)
+                last_error = e
+            except TransientError as e:
+                # Only this caller backs off; the rate budget is not the problem
+                delay = 2 ** attempt
+                print(f"[classify_raw] {e}, retrying in {delay}s "
+                      f"(attempt {attempt + 1}/{MAX_ATTEMPTS})", file=sys.stderr)
+                last_error = e
+                await asyncio.sleep(delay)
+        raise RuntimeError(f"Still failing after {MAX_ATTEMPTS} attempts: {last_error}")
+
+    async def _one(prompt: str, members: List[Tuple[str, Path]]) -> None:
+        nonlocal done
+        try:
+            first_id = members[0][0]
+            cached = load_valid_cached_response(model, prompt, first_id) if use_cache else None
+            raw_content = cached
+            if raw_content is None:
+                async with sem:
+                    raw_content = await call(prompt)
+            if write_group_result(raw_content, members, model) and use_cache and cached is None:
+                store_cached_response(model, prompt, raw_content)
+        finally:
+            done += 1
+            elapsed = time.monotonic() - started
+            eta = elapsed / done * (len(jobs) - done)
+            print(f"[classify_raw] {done}/{len(jobs)} requests done, "
+                  f"ETA {eta:.0f}s", file=sys.stderr)
+
+    try:
+        results = await asyncio.gather(
+            *[_one(*job) for job in jobs], return_exceptions=True
+        )
+    finally:
+        await close()
+
+    failed = 0
+    for (_, members), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            failed += len(members)
+            for contract_id, _ in members:
+                print(f"[classify_raw] FAILED {contract_id}: {result}")
+
+    print(f"[classify_raw] Classified {total - failed}/{total} contracts.")
+    return failed
+
+
+async def classify_raw_packed(
+    targets: List[str],
+    model: str,
+    pack_size: int,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_cache: bool = False,
+) -> int:
+    """
+    Classify many targets, `pack_size` contracts per request.
+
+    The fixed instructions are paid once per pack instead of once per
+    contract, and the model answers {"results": [...]} which is split back
+    into one validated file per contract. Keep packs small: long prompts
+    raise latency super-linearly and make cross-contract mix-ups likelier.
+
+    Returns the number of failed contracts.
+    """
+    resolved = []
+    for target in targets:
+        contract_path, contract_id, out_path = resolve_contract_target(target)
+        resolved.append((contract_id, load_contract(contract_path), out_path))
+
+    packs = [resolved[i:i + pack_size] for i in range(0, len(resolved), pack_size)]
+
+    client = make_async_client(concurrency)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _pack(pack) -> int:
+        prompt = build_packed_prompt([(cid, text) for cid, text, _ in pack])
+        cached = load_cached_response(model, prompt) if use_cache else None
+        raw_content = cached
+        if raw_content is None:
+            async with sem:
+                resp = await client.chat.completions.create(
+                    **completion_request(model, prompt, system=PACKED_SYSTEM_PROMPT)
+                )
+            raw_content = resp.choices[0].message.content
+
+        entries = parse_model_json(raw_content).get("results") or []
+        by_id = {e.get("id"): e for e in entries if isinstance(e, dict)}
+
+        failed = 0
+        all_valid = True
+        for contract_id, _, out_path in pack:
+            data = by_id.get(contract_id)
+            if data is None:
+                failed += 1
+                all_valid = False
+                print(f"[classify_raw] FAILED {contract_id}: missing from packed response")
+                continue
+            all_valid = write_raw_data(data, contract_id, out_path, model) and all_valid
+
+        # Only a reply that covers and validates for the whole pack is cached
+        if all_valid and use_cache and cached is None:
+            store_cached_response(model, prompt, raw_content)
+        return failed
+
+    try:
+        results = await asyncio.gather(*[_pack(p) for p in packs], return_exceptions=True)
+    finally:
+        await client.close()
+
+    failed = 0
+    for pack, result in zip(packs, results):
+        if isinstance(result, Exception):
+            failed += len(pack)
+            ids = ", ".join(cid for cid, _, _ in pack)
+            print(f"[classify_raw] FAILED pack [{ids}]: {result}")
+        else:
+            failed += result
+
+    print(f"[classify_raw] Classified {len(resolved) - failed}/{len(resolved)} contracts "
+          f"in {len(packs)} requests.")
+    return failed
+
+
+def classify_raw_batch(
+    targets: List[str],
+    model: str,
+    poll_seconds: int = BATCH_POLL_SECONDS,
+    use_cache: bool = False,
+) -> int:
+    """
+    Classify many targets through the OpenAI Batch API (/v1/batches).
+
+    One JSONL request per contract (custom_id = contract_id) is uploaded
+    and submitted with a 24h completion window. Batches cost roughly half
+    as much and are not bound by per-minute rate limits, but results can
+    take hours, so this blocks polling until the batch finishes. Each
+    result line is then validated and written exactly like a direct call.
+
+    Returns the number of failed contracts.
+    """
+    jobs: Dict[str, Tuple[Path, str]] = {}
+    lines = []
+    cached = 0
+    for target in targets:
+        contract_path, contract_id, out_path = resolve_contract_target(target)
+        if contract_id in jobs:
+            print(f"[classify_raw] Skipping duplicate contract id {contract_id}")
+            continue
+        prompt = build_prompt(contract_path, contract_id)
+
+        raw_content = load_valid_cached_response(model, prompt, contract_id) if use_cache else None
+        if raw_content is not None:
+            write_raw_result(raw_content, contract_id, out_path, model)
+            cached += 1
+            continue
+
+        jobs[contract_id] = (out_path, prompt)
+        lines.append(orjson.dumps({
+            "custom_id": contract_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": completion_request(model, prompt),
+        }))
+
+    if not jobs:
+        print(f"[classify_raw] All {cached} contracts were cached; nothing to submit.")
+        return 0
+
+    client = get_client()
+
+    batch_file = client.files.create(
+        file=("classify_raw_batch.jsonl", b"\n".join(lines)),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    print(f"[classify_raw] Submitted batch {batch.id} with {len(jobs)} requests")
+
+    while batch.status not in BATCH_TERMINAL_STATES:
+        time.sleep(poll_seconds)
+        batch = client.batches.retrieve(batch.id)
+        counts = batch.request_counts
+        done = f"{counts.completed}/{counts.total}" if counts else "?"
+        print(f"[classify_raw] Batch {batch.id}: {batch.status} ({done})")
+
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+
+    finished = set()
+    failed = 0
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).content.splitlines():
+            if not line.strip():
+                continue
+            item = orjson.loads(line)
+            contract_id = item["custom_id"]
+            finished.add(contract_id)
+
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                failed += 1
+                print(f"[classify_raw] FAILED {contract_id}: {item.get('error') or response}")
+                continue
+
+            raw_content = response["body"]["choices"][0]["message"]["content"]
+            out_path, prompt = jobs[contract_id]
+            try:
+                if write_raw_result(raw_content, contract_id, out_path, model) and use_cache:
+                    store_cached_response(model, prompt, raw_content)
+            except RuntimeError as e:
+                failed += 1
+                print(f"[classify_raw] FAILED {contract_id}: {e}")
+
+    # Requests that errored before producing a response only appear in the
+    # batch's error file, so count anything missing from the output.
+    for contract_id in jobs.keys() - finished:
+        failed += 1
+        print(f"[classify_raw] FAILED {contract_id}: no result in batch output")
+
+    print(f"[classify_raw] Classified {len(jobs) - failed}/{len(jobs)} contracts "
+          f"({cached} more from cache).")
+    return failed
+
+
+def all_synthetic_targets() -> List[str]:
+    """Every contract folder under data/synthetic/*/*."""
+    return [str(p) for p in sorted(SYNTHETIC_ROOT.glob("*/*")) if p.is_dir()]
 
 
 # ---------------------------------------------------------------------
@@ -355,6 +1058,7 @@ def main() -> None:
     parser.add_argument(
         "target",
         type=str,
+        nargs="?",
         help=(
             "Either:\n"
             "  • A Solidity contract ID (e.g., reentrancy_000), which will be "
@@ -363,6 +1067,69 @@ def main() -> None:
             "  • A path to a .sol file."
         ),
     )
+    parser.add_argument(
+        "--targets-file",
+        type=str,
+        default=None,
+        help="File with one target (ID or path) per line, classified concurrently.",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Classify every contract folder under data/synthetic/*/*.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Max in-flight OpenAI requests in bulk mode (default: {DEFAULT_CONCURRENCY}).",
+    )
+    parser.add_argument(
+        "--pack",
+        type=int,
+        default=1,
+        help="Bulk mode: contracts per request (default: 1, i.e. one contract per prompt).",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=DEFAULT_RPM,
+        help=f"Initial requests/min budget in bulk mode (default: {DEFAULT_RPM}; "
+             "updated from response headers).",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        default=DEFAULT_TPM,
+        help=f"Initial tokens/min budget in bulk mode (default: {DEFAULT_TPM}; "
+             "updated from response headers).",
+    )
+    parser.add_argument(
+        "--raw-http",
+        action="store_true",
+        help="Bulk mode: POST directly via an aiohttp pool instead of the OpenAI SDK.",
+    )
+    parser.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Bulk mode via the OpenAI Batch API (cheaper, up to 24h turnaround).",
+    )
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Single-target mode: wait for the full response instead of streaming it.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-classify contracts whose output JSON already exists and is valid.",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse validated replies from data/cache/classify_raw instead of calling "
+             "the API (ignored with --force).",
+    )
     parser.add_argument(
         "--model",
         type=str,
@@ -371,15 +1138,70 @@ def main() -> None:
     )
 
     args = parser.parse_args()
-
-    contract_path, contract_id, out_path = resolve_contract_target(args.target)
-
-    classify_raw_contract(
-        contract_path=contract_path,
-        contract_id=contract_id,
-        model=args.model,
-        out_path=out_path,
-    )
+    # --force means ask the model again, so cached replies are not replayed
+    use_cache = args.cache and not args.force
+
+    if not (args.all or args.targets_file or args.batch_api):
+        if args.target is None:
+            parser.error("a target, --targets-file, or --all is required")
+
+        contract_path, contract_id, out_path = resolve_contract_target(args.target)
+
+        classify_raw_contract(
+            contract_path=contract_path,
+            contract_id=contract_id,
+            model=args.model,
+            out_path=out_path,
+            use_cache=use_cache,
+            stream=not args.no_stream,
+            force=args.force,
+        )
+        return
+
+    # Bulk mode
+    targets = [args.target] if args.target else []
+    if args.targets_file:
+        lines = Path(args.targets_file).read_text(encoding="utf-8").splitlines()
+        targets += [line.strip() for line in lines if line.strip()]
+    if args.all:
+        targets += all_synthetic_targets()
+
+    # Resolve every target up front: one that cannot be resolved (e.g. a
+    # folder without malicious.sol) is counted as failed instead of
+    # aborting the run. Resumable: drop contracts that already have a
+    # valid result from the requested model.
+    pending = []
+    unresolved = 0
+    skipped = 0
+    for target in targets:
+        try:
+            _, contract_id, out_path = resolve_contract_target(target)
+        except (OSError, ValueError, RuntimeError) as e:
+            unresolved += 1
+            print(f"[classify_raw] FAILED {target}: {e}")
+            continue
+        if not args.force and already_classified(contract_id, out_path, args.model):
+            skipped += 1
+            continue
+        pending.append(target)
+    if skipped:
+        print(f"[SKIP] {skipped} contracts already classified")
+    targets = pending
+
+    if args.batch_api:
+        failed = classify_raw_batch(targets, args.model, use_cache=use_cache)
+    elif args.pack > 1:
+        failed = asyncio.run(classify_raw_packed(
+            targets, args.model, args.pack, args.concurrency, use_cache=use_cache,
+        ))
+    else:
+        failed = asyncio.run(classify_raw_many(
+            targets, args.model, args.concurrency,
+            use_cache=use_cache, raw_http=args.raw_http,
+            rpm=args.rpm, tpm=args.tpm,
+        ))
+    if failed or unresolved:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
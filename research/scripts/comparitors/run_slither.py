@@ -24,61 +24,216 @@ Use this script whenever:
     • Slither version changes
     • Raw JSON reports are missing or corrupted
     • New contracts were generated
+
+Contracts are analyzed in parallel (--jobs, default: one per CPU core).
+When slither-analyzer is importable, each worker drives it in-process via
+its Python API (Slither + every built-in detector), so Slither is imported
+once per worker rather than once per contract. Otherwise it falls back to
+the CLI via the current interpreter (`python -m slither`).
+
+Reports are cached in data/cache/slither/ under sha256(source + slither
+and solc versions), so unchanged contracts are copied instead of
+re-analyzed. manifest.json there maps each key to its last use, for
+pruning. Pass --no-cache to always run Slither.
 """
 
+import argparse
+import functools
+import hashlib
+import orjson
+import os
+import shutil
 import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
 from pathlib import Path
 
+try:
+    from slither import Slither
+    from slither.detectors import all_detectors
+    from slither.detectors.abstract_detector import AbstractDetector
+except ImportError:
+    Slither = None
+
 # Base directory
 BASE_DIR = Path("data/synthetic")
+CACHE_DIR = Path("data/cache/slither")
+MANIFEST_PATH = CACHE_DIR / "manifest.json"
 
+# Every built-in detector, collected once at import (i.e. once per worker)
+DETECTORS = [] if Slither is None else [
+    cls for cls in vars(all_detectors).values()
+    if isinstance(cls, type) and issubclass(cls, AbstractDetector)
+]
 
-def run_slither_on_file(sol_path: Path, out_path: Path):
+
+def run_slither_in_process(sol_path: Path, out_path: Path) -> bool:
+    """
+    Analyze a single malicious.sol with the Slither Python API and write
+    the detector results in the same shape as `slither --json`.
+    Returns True on success.
+    """
+    print(f"[Slither] {sol_path} → {out_path}", flush=True)
+
+    try:
+        sl = Slither(str(sol_path))
+        for detector in DETECTORS:
+            sl.register_detector(detector)
+        detectors = [r for results in sl.run_detectors() for r in results]
+    except Exception as e:
+        print(f"[ERROR] Slither failed for {sol_path}")
+        print(str(e)[:300], "...\n", flush=True)
+        return False
+
+    out_path.write_bytes(orjson.dumps({
+        "success": True,
+        "error": None,
+        "results": {"detectors": detectors},
+    }, option=orjson.OPT_INDENT_2))
+
+    print(f"[OK] Created {out_path}", flush=True)
+    return True
+
+
+def run_slither_on_file(sol_path: Path, out_path: Path) -> bool:
     """
     Runs Slither on a single malicious.sol file and writes raw JSON results.
+    Returns True on success.
     """
-    print(f"[Slither] {sol_path} → {out_path}")
+    print(f"[Slither] {sol_path} → {out_path}", flush=True)
 
     cmd = [
-        "uv", "run", "slither",
+        sys.executable, "-m", "slither",
         str(sol_path),
         "--json", str(out_path),
         "--json-types", "detectors",
         "--disable-color",
     ]
 
+    # Slither refuses to overwrite an existing --json file, so a stale
+    # report must not be mistaken for this run's output
+    out_path.unlink(missing_ok=True)
+
+    # The report goes to --json; the console output is not needed
     result = subprocess.run(
         cmd,
         text=True,
-        stdout=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
         stderr=subprocess.PIPE,
     )
 
-    if result.returncode != 0:
-        print(f"[ERROR] Slither failed for {sol_path}")
-        print(result.stderr[:300], "...\n")
+    # Slither exits non-zero whenever it reports findings, so success is
+    # judged by the report itself rather than the return code
+    try:
+        ok = orjson.loads(out_path.read_bytes()).get("success") is True
+    except (OSError, orjson.JSONDecodeError, AttributeError):
+        ok = False
+
+    if not ok:
+        print(f"[ERROR] Slither failed for {sol_path} (exit {result.returncode})")
+        print(result.stderr[:300], "...\n", flush=True)
+        return False
+
+    print(f"[OK] Created {out_path}", flush=True)
+    return True
+
+
+def tool_versions() -> str:
+    """slither + solc versions, folded into every cache key."""
+    try:
+        slither_version = metadata.version("slither-analyzer")
+    except metadata.PackageNotFoundError:
+        slither_version = "unknown"
+
+    try:
+        solc = subprocess.run(["solc", "--version"], text=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        solc_version = solc.stdout.strip().splitlines()[-1]
+    except (OSError, IndexError):
+        solc_version = "unknown"
+
+    return f"slither={slither_version};solc={solc_version}"
+
+
+def run_slither_on_folder(sol_path: Path, versions: str = "", use_cache: bool = True):
+    """
+    Pool task: analyze <folder>/malicious.sol into <folder>/slither.json.
+
+    Returns (ok, cache_key); cache_key is None when caching is off.
+    """
+    out_path = sol_path.parent / "slither.json"
+
+    key = None
+    if use_cache:
+        key = hashlib.sha256(sol_path.read_bytes() + versions.encode()).hexdigest()
+        cached = CACHE_DIR / f"{key}.json"
+        if cached.exists():
+            shutil.copyfile(cached, out_path)
+            print(f"[CACHE] {sol_path} → {out_path}", flush=True)
+            return True, key
+
+    if Slither is not None:
+        ok = run_slither_in_process(sol_path, out_path)
     else:
-        print(f"[OK] Created {out_path}")
+        ok = run_slither_on_file(sol_path, out_path)
+
+    if ok and key is not None:
+        shutil.copyfile(out_path, CACHE_DIR / f"{key}.json")
+    return ok, key
 
 
 def main():
     """
     Traverse NEW hierarchical structure and run Slither on all malicious.sol files.
     """
-    malicious_files = list(BASE_DIR.glob("*/*/malicious.sol"))
+    parser = argparse.ArgumentParser(description="Run Slither on all malicious contracts.")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of contracts analyzed in parallel (default: CPU count).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore data/cache/slither and re-run Slither on every contract.",
+    )
+    args = parser.parse_args()
 
-    if not malicious_files:
-        print("[WARN] No malicious.sol files found in data/synthetic/**/**/")
-        return
+    print(f"[INFO] Running Slither on malicious contracts with {args.jobs} workers...\n")
 
-    print(f"[INFO] Running Slither on {len(malicious_files)} malicious contracts...\n")
+    use_cache = not args.no_cache
+    if use_cache:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    task = functools.partial(
+        run_slither_on_folder,
+        versions=tool_versions(),
+        use_cache=use_cache,
+    )
+
+    # Paths are submitted as the directory walk yields them, so the first
+    # contracts are already being analyzed while the walk continues
+    with ProcessPoolExecutor(max_workers=args.jobs) as ex:
+        results = list(ex.map(task, BASE_DIR.glob("*/*/malicious.sol")))
 
-    for sol_path in malicious_files:
-        contract_folder = sol_path.parent
-        out_path = contract_folder / "slither.json"
-        run_slither_on_file(sol_path, out_path)
+    if not results:
+        print("[WARN] No malicious.sol files found in data/synthetic/**/**/")
+        return
 
-    print("\n[DONE] Slither analysis complete for all malicious contracts.")
+    # Only the parent touches the manifest, so workers never race on it
+    if use_cache:
+        manifest = orjson.loads(MANIFEST_PATH.read_bytes()) if MANIFEST_PATH.exists() else {}
+        now = time.time()
+        for ok, key in results:
+            if ok:
+                manifest[key] = now
+        MANIFEST_PATH.write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+
+    failed = sum(1 for ok, _ in results if not ok)
+    print(f"\n[DONE] Slither analysis complete for {len(results)} malicious contracts "
+          f"({failed} failed).")
 
 
 if __name__ == "__main__":
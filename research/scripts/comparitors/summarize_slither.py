@@ -37,8 +37,9 @@ Usage:
             data/synthetic/access_control/access_control_000/slither.json
 """
 
-import json
+import orjson
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # ======================================================================
@@ -126,73 +127,57 @@ CATEGORY_MAP = {
 # FALLBACK CLASSIFIER
 # ======================================================================
 
-def classify_detector(detector: str):
-    name = detector.lower()
-
-    # 1. ACCESS CONTROL
-    if "access" in name or "arbitrary" in name or "auth" in name:
-        return "access_control"
-
-    # 2. ARITHMETIC
-    if "overflow" in name or "underflow" in name or "arith" in name:
-        return "arithmetic"
-
-    # 3. DENIAL OF SERVICE
-    if "loop" in name or "gas" in name or "denial" in name or "dos" in name:
-        return "denial_of_service"
-
-    # 4. FRONT-RUNNING
-    if "timestamp" in name or "prng" in name or "random" in name or "front" in name:
-        return "front_running"
-
-    # 5. INITIALIZATION
-    if "uninit" in name or "shadow" in name or "constructor" in name:
-        return "initialization"
-
-    # 6. reentrancy (YOUR SPELLING)
-    if "reentranc" in name:
-        return "reentrancy"
-
-    # 7. SIGNATURE VERIFICATION
-    if "signature" in name or "ecdsa" in name or "collision" in name:
-        return "signature_verification"
-
-    # 8. UNCHECKED RETURN VALUE
-    if "unchecked" in name or "unused-return" in name or "lowlevel" in name:
-        return "unchecked_return_value"
-
-    # 9. UNENCRYPTED PRIVATE DATA
-    if "private" in name or "leak" in name:
-        return "unencrypted_private_data"
+# Substring keywords per category, checked in this order (first match wins)
+FALLBACK_KEYWORDS = [
+    ("access_control",            ["access", "arbitrary", "auth"]),
+    ("arithmetic",                ["overflow", "underflow", "arith"]),
+    ("denial_of_service",         ["loop", "gas", "denial", "dos"]),
+    ("front_running",             ["timestamp", "prng", "random", "front"]),
+    ("initialization",            ["uninit", "shadow", "constructor"]),
+    ("reentrancy",                ["reentranc"]),
+    ("signature_verification",    ["signature", "ecdsa", "collision"]),
+    ("unchecked_return_value",    ["unchecked", "unused-return", "lowlevel"]),
+    ("unencrypted_private_data",  ["private", "leak"]),
+    ("unprotected_self_destruct", ["selfdestruct", "suicide"]),
+]
+
+# CATEGORY_MAP plus every fallback result computed so far (including None),
+# so each detector name is classified at most once per process
+FULL_MAP = dict(CATEGORY_MAP)
 
-    # 10. UNPROTECTED SELF-DESTRUCT
-    if "selfdestruct" in name or "suicide" in name:
-        return "unprotected_self_destruct"
 
+def classify_detector(detector: str):
+    # Plain substring checks: for short names they beat any regex, and
+    # get_category memoizes the result in FULL_MAP anyway
+    name = detector.lower()
+    for category, keywords in FALLBACK_KEYWORDS:
+        for keyword in keywords:
+            if keyword in name:
+                return category
     return None
 
 
-
-
 def get_category(detector: str):
-    explicit = CATEGORY_MAP.get(detector)
-    if explicit:
-        return explicit
+    try:
+        return FULL_MAP[detector]
+    except KeyError:
+        pass
 
     fallback = classify_detector(detector)
     if fallback:
         print(f"[INFO] Fallback classified '{detector}' → '{fallback}'")
-        return fallback
+    else:
+        print(f"[WARNING] Could not classify '{detector}'")
 
-    print(f"[WARNING] Could not classify '{detector}'")
-    return None
+    FULL_MAP[detector] = fallback
+    return fallback
 
 # ======================================================================
 # SUMMARY EXTRACTION
 # ======================================================================
 
 def extract_summary(raw_path: Path):
-    data = json.loads(raw_path.read_text())
+    data = orjson.loads(raw_path.read_bytes())
     detectors = data.get("results", {}).get("detectors", [])
     summary = []
 
@@ -204,11 +189,11 @@ def extract_summary(raw_path: Path):
         detector = d.get("check", "")
         category = get_category(detector)
 
-        lines = []
-        for el in d.get("elements", []):
-            src = el.get("source_mapping", {})
-            if "lines" in src:
-                lines.extend(src["lines"])
+        lines = sorted({
+            ln
+            for el in d.get("elements", ())
+            for ln in el.get("source_mapping", {}).get("lines", ())
+        })
 
         summary.append({
             "slither_check": detector,
@@ -216,7 +201,7 @@ def extract_summary(raw_path: Path):
             "severity": impact,
             "confidence": d.get("confidence", ""),
             "description": d.get("description", "").strip(),
-            "lines": sorted(set(lines)),
+            "lines": lines,
         })
 
     return {
@@ -228,25 +213,35 @@ def extract_summary(raw_path: Path):
 # BULK MODE
 # ======================================================================
 
-def run_bulk():
+def normalize_one(raw: Path):
     """
-    Find every slither.json inside data/synthetic/**/**/
+    Pool task: write <folder>/slither_normalized.json for one report.
+    CATEGORY_MAP and FALLBACK_KEYWORDS are module-level, so each worker
+    builds them once on import instead of receiving them with every task.
     """
-    all_raw = sorted(Path("data/synthetic").glob("*/*/slither.json"))
-    print(f"[INFO] Found {len(all_raw)} raw Slither reports")
+    norm_path = raw.parent / "slither_normalized.json"
 
-    for raw in all_raw:
-        norm_path = raw.parent / "slither_normalized.json"
+    if norm_path.exists():
+        print(f"[SKIP] {norm_path} already exists", flush=True)
+        return
 
-        if norm_path.exists():
-            print(f"[SKIP] {norm_path} already exists")
-            continue
+    summary = extract_summary(raw)
+    norm_path.write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+    print(f"[OK] Normalized {raw} → {norm_path}", flush=True)
+
+
+def run_bulk(jobs=None):
+    """
+    Find every slither.json inside data/synthetic/**/**/ and normalize
+    them in parallel (`jobs` worker processes, default: CPU count).
+    """
+    # Reports are submitted as the directory walk yields them
+    all_raw = Path("data/synthetic").glob("*/*/slither.json")
 
-        summary = extract_summary(raw)
-        norm_path.write_text(json.dumps(summary, indent=2))
-        print(f"[OK] Normalized {raw} → {norm_path}")
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        count = sum(1 for _ in ex.map(normalize_one, all_raw))
 
-    print("[DONE] Bulk normalization complete")
+    print(f"[DONE] Bulk normalization complete ({count} raw Slither reports)")
 
 # ======================================================================
 # CLI
@@ -256,10 +251,12 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("file", nargs="?", help="Single slither.json path")
     parser.add_argument("--all", action="store_true", help="Process all files")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Worker processes for --all (default: CPU count)")
     args = parser.parse_args()
 
     if args.all:
-        return run_bulk()
+        return run_bulk(args.jobs)
 
     if not args.file:
         raise ValueError("Provide a file or use --all")
@@ -268,7 +265,7 @@ def main():
     norm_path = raw_path.parent / "slither_normalized.json"
 
     summary = extract_summary(raw_path)
-    norm_path.write_text(json.dumps(summary, indent=2))
+    norm_path.write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
 
     print(f"[OK] Normalized {raw_path} → {norm_path}")
 
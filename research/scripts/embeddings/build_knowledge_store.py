@@ -72,18 +72,41 @@ Writes:
       "chunk_index": <int>,
       "section_type": "explanation" | "example",
       "text": "...chunk text...",
-      "embedding": [ ... float32 list ... ]
+      "embedding_b64": "<base64 of the float16 vector bytes>",
+      "embedding_dtype": "float16",
+      "embedding_dim": <int>
     }
+
+  Readers decode the vector with
+      np.frombuffer(base64.b64decode(rec["embedding_b64"]), dtype=rec["embedding_dtype"])
+  (older stores carry a plain "embedding" float list instead).
+
+- The same store in structure-of-arrays form, for loaders that want a
+  contiguous, memory-mappable matrix:
+    knowledge_store.embeddings.npy   (N x D) float16, row i = record i
+    knowledge_store.meta.jsonl       each record without its embedding,
+                                     plus "row": i
 """
 
+import asyncio
+import base64
+import functools
+import hashlib
 import os
-import json
 import re
+import sqlite3
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, Iterator, List, Tuple
 
+import numpy as np
+import orjson
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
+
+try:
+    import tiktoken  # optional: exact token counts for batch packing
+except ImportError:
+    tiktoken = None
 
 
 # ---------------------------------------------------------------------------
@@ -92,11 +115,32 @@ from openai import OpenAI
 
 RAG_ROOT = Path("Research/RAG_docs")
 OUTPUT_FILE = Path("knowledge_store.jsonl")
+# {"model": EMBED_MODEL, "docs": {source_path: [mtime_ns, size]}} of the
+# docs in OUTPUT_FILE; unchanged docs are carried forward without re-chunking
+MANIFEST_FILE = OUTPUT_FILE.with_suffix(".manifest.json")
+META_FILE = OUTPUT_FILE.with_suffix(".meta.jsonl")
+EMBEDDINGS_FILE = OUTPUT_FILE.with_suffix(".embeddings.npy")
+EMBED_CACHE_PATH = Path(".embed_cache.sqlite")
 EMBED_MODEL = "text-embedding-3-large"
 
 # Explanation chunks can be bigger; examples are kept whole.
 EXPLANATION_MAX_CHARS = 1600
-BATCH_SIZE = 16  # number of chunks per embeddings API call
+# Batches are packed by token count rather than a fixed chunk count, staying
+# under the embeddings endpoint's per-request limits (300K tokens, 2048 inputs)
+BATCH_MAX_TOKENS = 250_000
+BATCH_MAX_INPUTS = 2048
+MAX_INFLIGHT = 12  # embeddings requests allowed in flight at once
+WRITE_BUFFER_BYTES = 1 << 20  # output file buffer for the JSONL writes
+
+# Doc structure patterns, compiled once for the whole corpus
+ATTACK_TYPE_RE = re.compile(r"AttackType:\s*([a-zA-Z0-9_]+)")
+VULN_NAME_RE = re.compile(r"Vulnerability Name:\s*([a-zA-Z0-9_]+)")
+# Every boundary split_doc_sections cares about, found in a single scan:
+# the 'Samples' heading, 'Example:' headings, and blank-line paragraph breaks
+DOC_BOUNDARY_RE = re.compile(
+    r"^(?P<samples>(?=Samples))|^(?P<example>(?=Example:\s))|(?P<para>\n\n)",
+    re.MULTILINE,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -108,16 +152,48 @@ api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     raise RuntimeError("OPENAI_API_KEY not found in .env")
 
-client = OpenAI(api_key=api_key)
+client = AsyncOpenAI(api_key=api_key)
+
+
+# ---------------------------------------------------------------------------
+# Embedding cache
+# ---------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=1)
+def get_embed_cache() -> sqlite3.Connection:
+    """
+    Content-addressed embedding cache: a chunk is only re-embedded when its
+    text (or the model) changes, so incremental rebuilds call the API for
+    the edits only. Opened on first use, so importing this module does not
+    create the cache file.
+    """
+    conn = sqlite3.connect(EMBED_CACHE_PATH)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS embeddings "
+        "(hash TEXT PRIMARY KEY, model TEXT, dim INT, vec BLOB)"
+    )
+    return conn
+
+
+def embed_cache_key(text: str) -> str:
+    return hashlib.blake2b(f"{EMBED_MODEL}\0{text}".encode()).hexdigest()
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def read_all_txt_docs(root: Path) -> List[Dict[str, Any]]:
-    """Recursively read all .txt files under RAG_docs/, tagging by category."""
-    docs: List[Dict[str, Any]] = []
+def read_all_txt_docs(
+    root: Path,
+    unchanged: Callable[[Path], bool] = lambda path: False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Recursively read all .txt files under RAG_docs/, tagging by category.
+
+    Docs are yielded one at a time, so only the doc being chunked is held
+    in memory rather than the whole corpus. Docs for which unchanged(path)
+    is true are yielded with "text": None and are not read at all.
+    """
     for path in root.rglob("*.txt"):
         if not path.is_file():
             continue
@@ -127,17 +203,17 @@ def read_all_txt_docs(root: Path) -> List[Dict[str, Any]]:
         except IndexError:
             # If somehow the file is directly under RAG_docs without a subfolder
             category = "unknown"
+        if unchanged(path):
+            yield {"category": category, "path": path, "text": None}
+            continue
         text = path.read_text(encoding="utf-8", errors="ignore").strip()
         if not text:
             continue
-        docs.append(
-            {
-                "category": category,
-                "path": path,
-                "text": text,
-            }
-        )
-    return docs
+        yield {
+            "category": category,
+            "path": path,
+            "text": text,
+        }
 
 
 def parse_attack_type(text: str, fallback: str) -> str:
@@ -152,181 +228,305 @@ def parse_attack_type(text: str, fallback: str) -> str:
 
     If not found, use the folder category as a fallback.
     """
-    m = re.search(r"AttackType:\s*([a-zA-Z0-9_]+)", text)
+    m = ATTACK_TYPE_RE.search(text)
     if m:
         return m.group(1).strip()
 
-    m2 = re.search(r"Vulnerability Name:\s*([a-zA-Z0-9_]+)", text)
+    m2 = VULN_NAME_RE.search(text)
     if m2:
         return m2.group(1).strip()
 
     return fallback
 
 
-def split_explanation_and_samples(text: str):
+def pack_paragraphs(paragraphs: List[str], max_chars: int = EXPLANATION_MAX_CHARS) -> List[str]:
+    """
+    Pack explanation paragraphs into chunks of up to max_chars to keep them
+    reasonably sized for embedding.
     """
-    Split doc into explanation vs samples sections.
+    chunks: List[str] = []
+    # Paragraphs of the chunk being built, joined once when it is flushed
+    parts: List[str] = []
+    cur_len = 0
 
-    We look for a 'Samples' heading:
+    for p in paragraphs:
+        addition_len = len(p) + (2 if parts else 0)
+        if parts and cur_len + addition_len > max_chars:
+            chunks.append("\n\n".join(parts))
+            parts = [p]
+            cur_len = len(p)
+        else:
+            parts.append(p)
+            cur_len += addition_len
 
-        Samples
-        =======
+    if parts:
+        chunks.append("\n\n".join(parts))
 
-    If not found, treat entire doc as explanation.
+    return chunks
+
+
+def split_doc_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Split a doc into [(section_type, chunk_text), ...] in one scan.
+
+    Before the first 'Samples' heading, blank lines separate explanation
+    paragraphs (packed by pack_paragraphs). After it, every line starting
+    with 'Example:' begins a new example chunk; anything between the
+    heading and the first example is dropped. A Samples section without
+    any 'Example:' line becomes a single chunk. No heading → the whole doc
+    is explanation.
     """
-    # Try to find 'Samples' as a heading
-    match = re.search(r"^Samples\s*=*.*$", text, flags=re.MULTILINE)
-    if not match:
-        return text.strip(), ""
+    paragraphs: List[str] = []
+    example_starts: List[int] = []
+    samples_start = None
+    prev = 0
+
+    for m in DOC_BOUNDARY_RE.finditer(text):
+        kind = m.lastgroup
+        if samples_start is None:
+            if kind == "para":
+                paragraphs.append(text[prev:m.start()])
+                prev = m.end()
+            elif kind == "samples":
+                paragraphs.append(text[prev:m.start()])
+                samples_start = m.start()
+        elif kind == "example":
+            example_starts.append(m.start())
+
+    if samples_start is None:
+        paragraphs.append(text[prev:])
+
+    sections = [
+        ("explanation", chunk)
+        for chunk in pack_paragraphs([p.strip() for p in paragraphs if p.strip()])
+    ]
+
+    if samples_start is not None:
+        if not example_starts:
+            sections.append(("example", text[samples_start:].strip()))
+        else:
+            ends = example_starts[1:] + [len(text)]
+            for start, end in zip(example_starts, ends):
+                chunk = text[start:end].strip()
+                if chunk:
+                    sections.append(("example", chunk))
 
-    idx = match.start()
-    explanation = text[:idx].strip()
-    samples = text[idx:].strip()
-    return explanation, samples
+    return sections
 
 
-def chunk_explanation(text: str, max_chars: int = EXPLANATION_MAX_CHARS) -> List[str]:
+def token_counter():
     """
-    Chunk explanation text by paragraphs up to max_chars to keep them
-    reasonably sized for embedding.
+    Return a text -> token count function for EMBED_MODEL. Without
+    tiktoken, fall back to a conservative ~3 characters per token.
     """
-    if not text:
-        return []
+    if tiktoken is None:
+        return lambda text: len(text) // 3 + 1
+    enc = tiktoken.encoding_for_model(EMBED_MODEL)
+    return lambda text: len(enc.encode(text, disallowed_special=()))
 
-    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
-    chunks: List[str] = []
-    current = ""
 
-    for p in paragraphs:
-        addition_len = len(p) + (2 if current else 0)
-        if current and len(current) + addition_len > max_chars:
-            chunks.append(current)
-            current = p
-        else:
-            current = p if not current else current + "\n\n" + p
+def pack_batches(chunks: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Greedily group chunks, in order, into batches of at most
+    BATCH_MAX_TOKENS tokens and BATCH_MAX_INPUTS inputs.
+    """
+    count_tokens = token_counter()
+    batches: List[List[Dict[str, Any]]] = []
+    cur: List[Dict[str, Any]] = []
+    cur_tokens = 0
 
-    if current:
-        chunks.append(current)
+    for chunk in chunks:
+        n = count_tokens(chunk["text"])
+        if cur and (cur_tokens + n > BATCH_MAX_TOKENS or len(cur) >= BATCH_MAX_INPUTS):
+            batches.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append(chunk)
+        cur_tokens += n
 
-    return chunks
+    if cur:
+        batches.append(cur)
+    return batches
 
 
-def split_samples_by_example(samples_text: str) -> List[str]:
-    """
-    Split the 'Samples' section into chunks by 'Example:' headings.
-    Each returned string contains one example's title, notes, and code.
+def doc_signature(path: Path) -> List[int]:
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
 
-    If there are no 'Example:' headings, returns [samples_text].
+
+def load_previous_build() -> tuple:
     """
-    if not samples_text:
-        return []
+    Return (manifest docs, {source_path: [records]}) from the last build,
+    or empty dicts if there is none or it used a different EMBED_MODEL.
+    """
+    if not (MANIFEST_FILE.exists() and OUTPUT_FILE.exists()):
+        return {}, {}
 
-    # Keep the 'Samples' heading attached to the first example
-    # but we split on lines that start with 'Example:'
-    # using a lookahead so we keep 'Example:' itself in the chunk.
-    matches = list(re.finditer(r"^Example:\s.*$", samples_text, flags=re.MULTILINE))
-    if not matches:
-        return [samples_text.strip()]
+    manifest = orjson.loads(MANIFEST_FILE.read_bytes())
+    if manifest.get("model") != EMBED_MODEL:
+        return {}, {}
 
-    chunks: List[str] = []
+    previous: Dict[str, List[Dict[str, Any]]] = {}
+    with OUTPUT_FILE.open("rb") as f:
+        for line in f:
+            rec = orjson.loads(line)
+            previous.setdefault(rec["source_path"], []).append(rec)
+    return manifest["docs"], previous
 
-    for i, m in enumerate(matches):
-        start = m.start()
-        end = matches[i + 1].start() if i + 1 < len(matches) else len(samples_text)
-        chunk = samples_text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
 
-    return chunks
+def encode_embedding(record: Dict[str, Any], emb: np.ndarray) -> None:
+    # float16 halves the bytes and base64 skips float formatting
+    # entirely: ~4x smaller than the float text, and far faster to parse
+    record["embedding_b64"] = base64.b64encode(emb.astype(np.float16).tobytes()).decode()
+    record["embedding_dtype"] = "float16"
+    record["embedding_dim"] = emb.shape[0]
 
 
-def embed_batch(texts: List[str]) -> List[List[float]]:
+def write_soa(records: List[Dict[str, Any]]) -> None:
+    """Write EMBEDDINGS_FILE (float16 N x D) and META_FILE (row-indexed metadata)."""
+    vecs = []
+    lines = []
+    for row, record in enumerate(records):
+        meta = {k: v for k, v in record.items() if not k.startswith("embedding")}
+        meta["row"] = row
+        lines.append(orjson.dumps(meta) + b"\n")
+        vecs.append(np.frombuffer(base64.b64decode(record["embedding_b64"]), dtype=np.float16))
+
+    with META_FILE.open("wb", buffering=WRITE_BUFFER_BYTES) as meta_f:
+        meta_f.writelines(lines)
+
+    if vecs:
+        np.save(EMBEDDINGS_FILE, np.stack(vecs))
+
+
+async def embed_batch(texts: List[str]) -> List[np.ndarray]:
     """Call OpenAI embeddings API for a batch of texts."""
     if not texts:
         return []
 
-    resp = client.embeddings.create(
-        model=EMBED_MODEL,
-        input=texts,
-    )
-    return [item.embedding for item in resp.data]
+    embed_cache = get_embed_cache()
+    keys = [embed_cache_key(t) for t in texts]
+    placeholders = ",".join("?" * len(keys))
+    hits = {
+        h: np.frombuffer(vec, dtype=np.float32)
+        for h, vec in embed_cache.execute(
+            f"SELECT hash, vec FROM embeddings WHERE hash IN ({placeholders})", keys
+        )
+    }
+
+    misses = [i for i, h in enumerate(keys) if h not in hits]
+    if misses:
+        # base64 float32 on the wire: decoded straight into an ndarray, never
+        # materialized as a JSON/Python list of floats
+        resp = await client.embeddings.create(
+            model=EMBED_MODEL,
+            input=[texts[i] for i in misses],
+            encoding_format="base64",
+        )
+        rows = []
+        for i, item in zip(misses, resp.data):
+            vec = np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32)
+            hits[keys[i]] = vec
+            rows.append((keys[i], EMBED_MODEL, vec.shape[0], vec.tobytes()))
+        embed_cache.executemany(
+            "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows
+        )
+        embed_cache.commit()
+
+    return [hits[h] for h in keys]
 
 
 # ---------------------------------------------------------------------------
 # Main pipeline
 # ---------------------------------------------------------------------------
 
-def main() -> None:
-    docs = read_all_txt_docs(RAG_ROOT)
-    print(f"Found {len(docs)} RAG docs under {RAG_ROOT}")
+async def main() -> None:
+    prev_docs, prev_records = load_previous_build()
+
+    def unchanged(path: Path) -> bool:
+        key = str(path)
+        return key in prev_records and prev_docs.get(key) == doc_signature(path)
+
+    # Every output record, in doc order. Flatten every new chunk of every doc
+    # up front, so batches can be embedded concurrently instead of one round
+    # trip at a time
+    all_records: List[Dict[str, Any]] = []
+    all_chunks: List[Dict[str, Any]] = []
+    manifest_docs: Dict[str, List[int]] = {}
+
+    num_docs = 0
+    reused = 0
+    for doc in read_all_txt_docs(RAG_ROOT, unchanged):
+        num_docs += 1
+        category = doc["category"]
+        path: Path = doc["path"]
+        raw_text: str = doc["text"]
+        manifest_docs[str(path)] = doc_signature(path)
+
+        if raw_text is None:
+            # Same mtime and size as last build: keep its embedded records
+            all_records.extend(prev_records[str(path)])
+            reused += 1
+            continue
 
-    total_chunks = 0
+        attack_type = parse_attack_type(raw_text, fallback=category)
 
-    with OUTPUT_FILE.open("w", encoding="utf-8") as out_f:
-        for doc in docs:
-            category = doc["category"]
-            path: Path = doc["path"]
-            raw_text: str = doc["text"]
+        sections = split_doc_sections(raw_text)
 
-            attack_type = parse_attack_type(raw_text, fallback=category)
+        for chunk_index, (section_type, chunk_text) in enumerate(sections):
+            record = {
+                "id": f"{category}::{path.name}::chunk_{chunk_index}",
+                "category": category,
+                "attack_type": attack_type,
+                "source_path": str(path),
+                "chunk_index": chunk_index,
+                "section_type": section_type,  # "explanation" or "example"
+                "text": chunk_text,
+            }
+            all_records.append(record)
+            all_chunks.append(record)
 
-            explanation_text, samples_text = split_explanation_and_samples(raw_text)
+        if sections:
+            print(f"Chunked {path} → {len(sections)} chunks")
 
-            explanation_chunks = chunk_explanation(explanation_text)
-            example_chunks = split_samples_by_example(samples_text)
+    print(f"Found {num_docs} RAG docs under {RAG_ROOT} ({reused} unchanged)")
 
-            # Build a list of (section_type, chunk_text) for embedding
-            all_sections: List[Dict[str, Any]] = []
+    # Embed in batches, at most MAX_INFLIGHT requests at a time
+    sem = asyncio.Semaphore(MAX_INFLIGHT)
 
-            for chunk_text in explanation_chunks:
-                all_sections.append(
-                    {
-                        "section_type": "explanation",
-                        "text": chunk_text,
-                    }
-                )
+    async def sem_embed(batch: List[Dict[str, Any]]) -> List[np.ndarray]:
+        async with sem:
+            return await embed_batch([c["text"] for c in batch])
 
-            for chunk_text in example_chunks:
-                all_sections.append(
-                    {
-                        "section_type": "example",
-                        "text": chunk_text,
-                    }
-                )
+    # Identical chunk texts (shared boilerplate across docs) are embedded once
+    unique_chunks = list({c["text"]: c for c in all_chunks}.values())
 
-            if not all_sections:
-                continue
+    batches = pack_batches(unique_chunks)
+    print(f"Embedding {len(unique_chunks)} unique chunks "
+          f"(of {len(all_chunks)}) in {len(batches)} requests")
+    results = await asyncio.gather(*(sem_embed(b) for b in batches))
 
-            # Embed in batches for efficiency
-            batch_start = 0
-            chunk_index = 0
+    vec_by_text: Dict[str, np.ndarray] = {}
+    for batch, embeddings in zip(batches, results):
+        for chunk, emb in zip(batch, embeddings):
+            vec_by_text[chunk["text"]] = emb
 
-            while batch_start < len(all_sections):
-                batch = all_sections[batch_start : batch_start + BATCH_SIZE]
-                batch_texts = [s["text"] for s in batch]
-                embeddings = embed_batch(batch_texts)
+    for record in all_chunks:
+        encode_embedding(record, vec_by_text[record["text"]])
 
-                for local_idx, (section, emb) in enumerate(zip(batch, embeddings)):
-                    record = {
-                        "id": f"{category}::{path.name}::chunk_{chunk_index}",
-                        "category": category,
-                        "attack_type": attack_type,
-                        "source_path": str(path),
-                        "chunk_index": chunk_index,
-                        "section_type": section["section_type"],  # "explanation" or "example"
-                        "text": section["text"],
-                        "embedding": emb,
-                    }
-                    out_f.write(json.dumps(record) + "\n")
-                    chunk_index += 1
-                    total_chunks += 1
+    # Records are only written once every embedding is in, so the whole
+    # store goes out through one large buffer instead of a write per chunk
+    with OUTPUT_FILE.open("wb", buffering=WRITE_BUFFER_BYTES) as out_f:
+        out_f.writelines(orjson.dumps(record) + b"\n" for record in all_records)
 
-                batch_start += BATCH_SIZE
+    # SoA copy: one contiguous matrix + metadata-only records
+    write_soa(all_records)
 
-            print(f"Processed {path} → {chunk_index} chunks")
+    MANIFEST_FILE.write_bytes(orjson.dumps(
+        {"model": EMBED_MODEL, "docs": manifest_docs}, option=orjson.OPT_INDENT_2
+    ))
 
-    print(f"Done. Wrote {total_chunks} chunks to {OUTPUT_FILE}")
+    print(f"Done. Wrote {len(all_records)} chunks to {OUTPUT_FILE}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
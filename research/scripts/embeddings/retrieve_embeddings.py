@@ -21,8 +21,16 @@ Input:
                 "source_path": "...",
                 "chunk_index": int,
                 "text": "<chunk text>",
-                "embedding": [float, float, ...]
+                "embedding_b64": "...",       # base64 float16 vector
+                "embedding_dtype": "float16",
+                "embedding_dim": int
             }
+        Older stores with a plain "embedding": [float, ...] list still load.
+
+    knowledge_store.embeddings.npy + knowledge_store.meta.jsonl
+        Structure-of-arrays copy written by build_knowledge_store.py.
+        When both are at least as new as the JSONL, they are loaded
+        instead, so no embedding has to be parsed out of JSON.
 
 Responsibilities:
     • Load embeddings + metadata from the knowledge store
@@ -40,10 +48,15 @@ Usage Example:
     store.load()
 
     results = store.retrieve("What is a reentrancy attack?", k=5)
+
+    # or, to reuse one embedding for several lookups:
+    q = store.embed_query("What is a reentrancy attack?")
+    results = store.search(q, k=5)
     for r in results:
         print(r["score"], r["category"], r["source"])
 """
 
+import base64
 import os
 import json
 from pathlib import Path
@@ -66,6 +79,15 @@ if not api_key:
 client = OpenAI(api_key=api_key)
 
 
+def record_embedding(rec: Dict) -> np.ndarray:
+    """Pop and decode a record's vector (base64 or legacy float list)."""
+    if "embedding_b64" in rec:
+        rec.pop("embedding_dim", None)
+        raw = base64.b64decode(rec.pop("embedding_b64"))
+        return np.frombuffer(raw, dtype=rec.pop("embedding_dtype", "float16"))
+    return np.asarray(rec.pop("embedding"), dtype="float32")
+
+
 # KNOWLEDGE STORE CLASS
 class KnowledgeStore:
     """
@@ -75,6 +97,8 @@ class KnowledgeStore:
 
     def __init__(self, path: Path = STORE_PATH):
         self.path = Path(path)
+        self.meta_path = self.path.with_suffix(".meta.jsonl")
+        self.embeddings_path = self.path.with_suffix(".embeddings.npy")
         self.records: List[Dict] = []
         self.embeddings: Optional[np.ndarray] = None
 
@@ -84,10 +108,11 @@ class KnowledgeStore:
         """
         Load all JSONL records and populate:
             • self.records          (metadata)
-            • self.embeddings       (float32 matrix)
+            • self.embeddings       (float32 matrix, rows L2-normalized)
 
         Each JSONL line is expected to contain at least:
-            id, category, source_path, chunk_index, text, embedding
+            id, category, source_path, chunk_index, text,
+            and embedding_b64 (or a legacy embedding list)
 
         Additional keys (attack_type, section_type, etc.) are preserved.
         """
@@ -95,22 +120,37 @@ class KnowledgeStore:
         if not self.path.exists():
             raise FileNotFoundError(f"Knowledge store missing: {self.path}")
 
-        self.records = []
-        vectors = []
+        if self._soa_is_fresh():
+            with self.meta_path.open("r", encoding="utf-8") as f:
+                self.records = [json.loads(line) for line in f]
+            self.embeddings = np.load(self.embeddings_path, mmap_mode="r").astype("float32")
+        else:
+            self.records = []
+            vectors = []
 
-        with self.path.open("r", encoding="utf-8") as f:
-            for line in f:
-                rec = json.loads(line)
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    rec = json.loads(line)
 
-                # Keep the full record so we don't lose fields like id/chunk_index
-                self.records.append(rec)
+                    # Embeddings matrix for retrieval
+                    vectors.append(record_embedding(rec))
 
-                # Embeddings matrix for retrieval
-                vectors.append(rec["embedding"])
+                    # Keep the rest of the record so we don't lose fields like id/chunk_index
+                    self.records.append(rec)
 
-        self.embeddings = np.array(vectors, dtype="float32")
+            self.embeddings = np.array(vectors, dtype="float32")
+
+        # Normalize rows once here so search() only normalizes the query
+        self.embeddings /= np.linalg.norm(self.embeddings, axis=1, keepdims=True) + 1e-12
         print(f"[KnowledgeStore] Loaded {len(self.records)} chunks from {self.path}.")
 
+    def _soa_is_fresh(self) -> bool:
+        src_mtime = self.path.stat().st_mtime
+        return all(
+            p.exists() and p.stat().st_mtime >= src_mtime
+            for p in (self.meta_path, self.embeddings_path)
+        )
+
     # ------------------------ EMBED QUERY -----------------------------
 
     def embed_query(self, text: str) -> np.ndarray:
@@ -126,11 +166,19 @@ class KnowledgeStore:
         """
         Return top-k most similar chunks to the query.
 
+        Equivalent to search(embed_query(query), k).
+        """
+        q = self.embed_query(query)
+        return self.search(q, k)
+
+    def search(self, q: np.ndarray, k: int = 5):
+        """
+        Return top-k most similar chunks to an already-embedded query.
+
         Steps:
-            1. Embed query
-            2. Normalize query + store vectors
-            3. Compute cosine similarity
-            4. Rank and return top results
+            1. Normalize query (store rows are normalized at load)
+            2. Compute cosine similarity
+            3. Rank and return top results
 
         Each result dict includes:
             score, id, category, attack_type, source, chunk_index,
@@ -138,25 +186,21 @@ class KnowledgeStore:
         """
 
         if self.embeddings is None:
-            raise RuntimeError("Call .load() before retrieve().")
+            raise RuntimeError("Call .load() before search().")
 
-        # (1) Embed query
-        q = self.embed_query(query)
-
-        # (2) Normalize store + query
-        norm_store = self.embeddings / np.linalg.norm(
-            self.embeddings, axis=1, keepdims=True
-        )
-        norm_query = q / np.linalg.norm(q)
+        # (1) Normalize query
+        norm_query = q / (np.linalg.norm(q) + 1e-12)
 
-        # (3) Cosine similarity
-        sims = norm_store @ norm_query
+        # (2) Cosine similarity
+        sims = self.embeddings @ norm_query
 
-        # (4) Rank highest → lowest
-        ranked = np.argsort(-sims)
+        # (3) Rank highest → lowest (partial top-k, then sort only those k)
+        k = min(k, sims.shape[0])
+        part = np.argpartition(-sims, k - 1)[:k]
+        ranked = part[np.argsort(-sims[part])]
 
         results = []
-        for idx in ranked[:k]:
+        for idx in ranked:
             rec = self.records[idx]
             results.append(
                 {
@@ -24,19 +24,26 @@ This script DOES NOT:
 Usage:
     uv run python scripts/generation/generate_contracts.py \
         --num_contracts 10 \
-        --model gpt-5.1
+        --model gpt-5.1 \
+        --concurrency 8
+
+Contract pairs are generated concurrently (--concurrency requests in
+flight). Every (attack_type, contract_id) slot is assigned up front, so
+concurrent generations never race on the folder numbering.
 """
 
 
 import argparse
+import asyncio
+import functools
+import logging
 import random
 from pathlib import Path
-from datetime import datetime
-from openai import OpenAI
+from openai import APIError, AsyncOpenAI, RateLimitError
 from dotenv import load_dotenv
 
 load_dotenv()
-client = OpenAI()
+aclient = AsyncOpenAI()
 
 # DIRECTORIES
 
@@ -44,7 +51,6 @@ BASE_DIR = Path("data/synthetic")
 LOG_FILE = BASE_DIR / "generation.log"
 
 PROMPT_PATH = Path("prompts/generate_contracts.txt")
-PROMPT_TEMPLATE = PROMPT_PATH.read_text()
 
 # ATTACK CATEGORIES
 ATTACK_TYPES = [
@@ -61,115 +67,135 @@ ATTACK_TYPES = [
 ]
 
 ALLOWED_MODELS = ["gpt-4.1-mini", "gpt-4.1", "gpt-5.1"]
+DEFAULT_CONCURRENCY = 8
+MAX_RETRIES = 5
 
 
-# LOG HELPER
-def log(msg: str):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOG_FILE, "a") as f:
-        f.write(f"[{timestamp}] {msg}\n")
+# PROMPT
+@functools.lru_cache(maxsize=1)
+def load_prompt_template() -> str:
+    """Load the generate_contracts.txt prompt template (read once per process)."""
+    if not PROMPT_PATH.exists():
+        raise FileNotFoundError(f"Generation prompt not found: {PROMPT_PATH}")
+    return PROMPT_PATH.read_text(encoding="utf-8")
 
 
-# COUNT HELPERS
-def count_existing_for_attack(attack_type: str) -> int:
-    folder = BASE_DIR / attack_type
-    if not folder.exists():
-        return 0
-    return sum(1 for x in folder.iterdir() if x.is_dir())
+def fill_prompt_template(attack_type: str, contract_id: str) -> str:
+    """
+    Fill {attack_type} and {contract_id} with plain replacements, so the
+    JSON braces in the prompt's example need no escaping.
+    """
+    return (
+        load_prompt_template()
+        .replace("{attack_type}", attack_type)
+        .replace("{contract_id}", contract_id)
+    )
 
 
-def get_next_attack_type() -> str:
-    counts = {a: count_existing_for_attack(a) for a in ATTACK_TYPES}
-    return min(counts, key=lambda a: counts[a])
+# LOG HELPER
+# One open, buffered handle for the whole run (logging handlers are
+# thread-safe). A dedicated logger keeps openai/httpx records out of the file.
+_handler = logging.FileHandler(LOG_FILE, delay=True)
+_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+logger = logging.getLogger("generate_contracts")
+logger.addHandler(_handler)
+logger.setLevel(logging.INFO)
+logger.propagate = False
 
+log = logger.info
 
-def get_next_local_index(attack_type: str) -> int:
+
+# COUNT HELPERS
+def scan_attack_folder(attack_type: str):
+    """
+    One directory listing per attack type, returning
+    (number of contract folders, next free local index).
+    """
     folder = BASE_DIR / attack_type
     if not folder.exists():
-        return 0
+        return 0, 0
 
+    count = 0
     max_idx = -1
     for child in folder.iterdir():
-        if child.is_dir() and child.name.startswith(attack_type):
+        if not child.is_dir():
+            continue
+        count += 1
+        if child.name.startswith(attack_type):
             try:
                 idx = int(child.name.split("_")[-1])
                 max_idx = max(max_idx, idx)
             except:
                 pass
 
-    return max_idx + 1
+    return count, max_idx + 1
+
+
+def get_next_attack_type(counts: dict) -> str:
+    return min(counts, key=counts.get)
 
 
 # PARSE LLM OUTPUT
+MALICIOUS_MARKER = "// MALICIOUS CONTRACT"
+SAFE_MARKER = "// SAFE CONTRACT"
+
+
 def parse_llm_output(raw_output: str):
     """
     Extract:
-        metadata_json, malicious contract text, safe contract text
-    but ignore metadata entirely (we do not save it).
+        malicious contract text, safe contract text
+    The leading metadata JSON is ignored entirely (we do not save it),
+    so the contracts are located directly by their delimiters.
     """
-    try:
-        # Extract JSON blob
-        start = raw_output.find("{")
-        if start == -1:
-            log("[ERROR] No JSON metadata found.")
-            return None, None
-
-        brace_count = 0
-        end = None
-
-        for i, ch in enumerate(raw_output[start:], start):
-            if ch == "{":
-                brace_count += 1
-            elif ch == "}":
-                brace_count -= 1
-                if brace_count == 0:
-                    end = i + 1
-                    break
-
-        if end is None:
-            log("[ERROR] JSON block not closed.")
-            return None, None
-
-        # Extract Solidity code
-        remainder = raw_output[end:].strip()
-        parts = remainder.split("// SAFE CONTRACT")
-        if len(parts) < 2:
-            log("[ERROR] SAFE CONTRACT delimiter missing.")
-            return None, None
-
-        mal = parts[0].replace("// MALICIOUS CONTRACT", "").strip()
-        safe = parts[1].strip()
-
-        return mal, safe
-
-    except Exception as e:
-        log(f"[PARSE ERROR] {e}")
+    mal_idx = raw_output.find(MALICIOUS_MARKER)
+    if mal_idx == -1:
+        log("[ERROR] MALICIOUS CONTRACT delimiter missing.")
         return None, None
 
-# GENERATE ONE CONTRACT PAIR
-def generate_one(attack_type: str, model: str):
-    local_idx = get_next_local_index(attack_type)
-    contract_id = f"{attack_type}_{local_idx:03d}"
+    safe_idx = raw_output.find(SAFE_MARKER, mal_idx)
+    if safe_idx == -1:
+        log("[ERROR] SAFE CONTRACT delimiter missing.")
+        return None, None
 
-    log(f"[GEN] {contract_id} ({attack_type}) using {model}")
+    mal = raw_output[mal_idx + len(MALICIOUS_MARKER):safe_idx].strip()
+    safe = raw_output[safe_idx + len(SAFE_MARKER):].strip()
 
-    prompt = PROMPT_TEMPLATE.format(
-        attack_type=attack_type,
-        contract_id=contract_id
-    )
+    return mal, safe
 
-    # Call OpenAI Responses API
-    response = client.responses.create(
-        model=model,
-        input=prompt
-    )
-    raw_output = response.output_text
 
-    malicious, safe = parse_llm_output(raw_output)
+# GENERATE ONE CONTRACT PAIR
+async def generate_one(attack_type: str, contract_id: str, model: str):
+    log(f"[GEN] {contract_id} ({attack_type}) using {model}")
+
+    prompt = fill_prompt_template(attack_type, contract_id)
+
+    for attempt in range(MAX_RETRIES):
+        # Call OpenAI Responses API
+        try:
+            response = await aclient.responses.create(
+                model=model,
+                input=prompt
+            )
+        except RateLimitError:
+            log(f"[retry] Rate limited → retrying {contract_id}")
+            await asyncio.sleep(2 ** attempt)
+            continue
+        except APIError as e:
+            # The SDK already retried transient errors; leave this slot
+            # unfilled rather than failing the other generations
+            log(f"[ERROR] {contract_id} API error → skipped: {e}")
+            return
+        raw_output = response.output_text
+
+        malicious, safe = parse_llm_output(raw_output)
+        if malicious is not None and safe is not None:
+            break
 
-    if malicious is None or safe is None:
         log(f"[retry] Failed → retrying {contract_id}")
-        return generate_one(attack_type, model)
+        await asyncio.sleep(2 ** attempt)
+    else:
+        log(f"[ERROR] {contract_id} failed after {MAX_RETRIES} attempts → skipped.")
+        return
 
     # Folder path: data/synthetic/<attack>/<attack_000>
     folder = BASE_DIR / attack_type / contract_id
@@ -183,10 +209,45 @@ def generate_one(attack_type: str, model: str):
 
 
 # GENERATE MANY CONTRACTS
-def generate_dataset(num_contracts: int, model: str):
+def assign_slots(num_contracts: int):
+    """
+    Pick (attack_type, contract_id) for every contract up front, with the
+    round-robin-by-count rule (get_next_attack_type), so the
+    concurrent generations never compete for a folder index.
+    """
+    # Scanned once; the in-memory counters are advanced per assigned slot
+    counts = {}
+    next_idx = {}
+    for a in ATTACK_TYPES:
+        counts[a], next_idx[a] = scan_attack_folder(a)
+
+    slots = []
     for _ in range(num_contracts):
-        attack = get_next_attack_type()
-        generate_one(attack, model)
+        attack = get_next_attack_type(counts)
+        slots.append((attack, f"{attack}_{next_idx[attack]:03d}"))
+        counts[attack] += 1
+        next_idx[attack] += 1
+    return slots
+
+
+async def generate_dataset(num_contracts: int, model: str,
+                           concurrency: int = DEFAULT_CONCURRENCY):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def bounded(attack_type: str, contract_id: str):
+        async with sem:
+            await generate_one(attack_type, contract_id, model)
+
+    slots = assign_slots(num_contracts)
+    results = await asyncio.gather(
+        *(bounded(attack, contract_id) for attack, contract_id in slots),
+        return_exceptions=True,
+    )
+
+    # Anything unexpected fails only its own slot
+    for (_, contract_id), result in zip(slots, results):
+        if isinstance(result, Exception):
+            log(f"[ERROR] {contract_id} failed → skipped: {result}")
 
 
 # CLI
@@ -195,6 +256,8 @@ def main():
     parser.add_argument("--num_contracts", type=int, default=1)
     parser.add_argument("--seed", type=int, default=4940)
     parser.add_argument("--model", type=str, required=True)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Contract pairs generated in parallel")
     args = parser.parse_args()
 
     if args.model not in ALLOWED_MODELS:
@@ -203,7 +266,7 @@ def main():
     random.seed(args.seed)
     log("=== Generation Start ===")
 
-    generate_dataset(args.num_contracts, args.model)
+    asyncio.run(generate_dataset(args.num_contracts, args.model, args.concurrency))
 
     log("=== Generation Complete ===")
 
@@ -10,6 +10,11 @@ Supports the following steps:
     4. classify_raw.py
     5. classify_rag.py
 
+Every step runs with the current interpreter (no extra `uv run` layer).
+RAW and RAG classification are independent, so --classify-all and
+--all-full run them together through classify_all.py, which drives both
+classifiers concurrently in one process.
+
 Typical usage:
 
     # Full generation → slither → summarize
@@ -32,7 +37,9 @@ from pathlib import Path
 # Helper
 # ======================================================================
 def run_script(path: str, args: list[str]):
-    cmd = ["uv", "run", "python", path] + args
+    # The pipeline already runs inside the project environment, so the
+    # step reuses this interpreter instead of paying for `uv run` again
+    cmd = [sys.executable, path] + args
     print(f"\n[PIPELINE] Running: {' '.join(cmd)}\n")
     result = subprocess.run(cmd)
 
@@ -51,10 +58,11 @@ SLITHER_SCRIPT   = SCRIPTS_DIR / "comparitors"     / "run_slither.py"
 SUMMARY_SCRIPT   = SCRIPTS_DIR / "comparitors"     / "summarize_slither.py"
 RAW_CLASS_SCRIPT = SCRIPTS_DIR / "classification"  / "classify_raw.py"
 RAG_CLASS_SCRIPT = SCRIPTS_DIR / "classification"  / "classify_rag.py"
+ALL_CLASS_SCRIPT = SCRIPTS_DIR / "classification"  / "classify_all.py"
 
 # Validate existence
 for script in (GEN_SCRIPT, SLITHER_SCRIPT, SUMMARY_SCRIPT,
-               RAW_CLASS_SCRIPT, RAG_CLASS_SCRIPT):
+               RAW_CLASS_SCRIPT, RAG_CLASS_SCRIPT, ALL_CLASS_SCRIPT):
     if not script.exists():
         print(f"[ERROR] Missing script: {script}")
         sys.exit(1)
@@ -127,9 +135,8 @@ def main():
         run_script(str(SLITHER_SCRIPT), [])
         run_script(str(SUMMARY_SCRIPT), ["--all"])
 
-        # run classification on all contracts
-        run_script(str(RAW_CLASS_SCRIPT), ["--all"])
-        run_script(str(RAG_CLASS_SCRIPT), ["--all"])
+        # run RAW + RAG classification on all contracts, concurrently
+        run_script(str(ALL_CLASS_SCRIPT), model_arg)
 
         print("\n[PIPELINE] FULL END-TO-END COMPLETE ✔\n")
         return
@@ -158,8 +165,7 @@ def main():
         run_script(str(RAG_CLASS_SCRIPT), ["--all"])
 
     if args.classify_all:
-        run_script(str(RAW_CLASS_SCRIPT), ["--all"])
-        run_script(str(RAG_CLASS_SCRIPT), ["--all"])
+        run_script(str(ALL_CLASS_SCRIPT), model_arg)
 
     # ------------------------------------------------------------------
     # No flags → show help